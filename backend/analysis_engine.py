@@ -0,0 +1,125 @@
+"""
+Columnar analysis engine for historical statistics
+Loads years x variables into NumPy arrays once and computes probabilities,
+threshold exceedances and linear trends in vectorized form.
+Arrays may carry extra trailing axes (e.g. years x hours); reductions run over years.
+"""
+import numpy as np
+
+
+def to_columns(historical_years):
+    """Convert the list of per-year records into one array per variable"""
+    return {
+        'year': np.array([y['year'] for y in historical_years], dtype=float),
+        'temperature_c': np.array([y['temperature_c'] for y in historical_years], dtype=float),
+        'precipitation_mm': np.array([y['precipitation_mm'] for y in historical_years], dtype=float),
+        'rained': np.array([bool(y['rained']) for y in historical_years], dtype=bool),
+        'was_favorable': np.array([bool(y['was_favorable']) for y in historical_years], dtype=bool)
+    }
+
+
+def summary_statistics(columns):
+    """Rain/favorable counts and probabilities plus temperature and rain averages"""
+    rained = columns['rained']
+    total_years = len(rained)
+    rainy_years = int(np.count_nonzero(rained))
+    favorable_years = int(np.count_nonzero(columns['was_favorable']))
+
+    return {
+        'total_years': total_years,
+        'rainy_years': rainy_years,
+        'favorable_years': favorable_years,
+        'rain_probability': (rainy_years / total_years) * 100,
+        'favorable_probability': (favorable_years / total_years) * 100,
+        'average_temperature_c': float(columns['temperature_c'].sum() / total_years),
+        'average_precipitation_when_rain_mm': float(
+            columns['precipitation_mm'][rained].sum() / max(rainy_years, 1)
+        )
+    }
+
+
+def favorable_mask(precipitation_mm, rained, activity):
+    """Vectorized favorable-conditions rule for real observations"""
+    if activity in ['harvest', 'event']:
+        return ~rained
+    elif activity == 'planting':
+        return (precipitation_mm > 2) & (precipitation_mm < 30)
+    else:
+        return precipitation_mm < 15
+
+
+def count_exceedances(values, threshold):
+    """Number of years whose value is strictly above the threshold"""
+    return int(np.count_nonzero(np.asarray(values) > threshold))
+
+
+def linear_slopes(x, y):
+    """
+    Least-squares slope of y against x along the first axis
+    y may be 1-D (years) or N-D (years x variables x ...); returns one slope per column
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_centered = x - x.mean()
+    denominator = np.dot(x_centered, x_centered)
+    return np.tensordot(x_centered, y - y.mean(axis=0), axes=(0, 0)) / denominator
+
+
+def masked_linear_slopes(x, y, valid):
+    """
+    linear_slopes where only some years have data
+    valid (broadcastable to y) marks the years to use per column; NaN where fewer than two
+    """
+    x = np.asarray(x, dtype=float).reshape((-1,) + (1,) * (np.ndim(y) - 1))
+    weights = np.broadcast_to(valid, np.shape(y)).astype(float)
+    y = np.where(weights > 0, y, 0.0)
+    count = weights.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_centered = x - (weights * x).sum(axis=0) / count
+        y_mean = (weights * y).sum(axis=0) / count
+        numerator = (weights * x_centered * (y - y_mean)).sum(axis=0)
+        denominator = (weights * x_centered * x_centered).sum(axis=0)
+        return np.where(count >= 2, numerator / denominator, np.nan)
+
+
+def risk_scores(precipitation_mm, precipitation_probability, soil_moisture_index, wind_speed_ms, activity):
+    """
+    Vectorized counterpart of calculate_risk_score
+    Inputs are arrays of shape (..., days); returns integer risk per leading cell
+    """
+    if activity in ['harvest', 'event']:
+        # For harvest/events: rain is bad
+        risk = np.where(precipitation_mm > 10, 20, np.where(precipitation_probability > 50, 10, 0))
+        # High soil moisture is bad for harvest
+        if activity == 'harvest':
+            risk = risk + np.where(soil_moisture_index > 0.6, 10, 0)
+    elif activity == 'planting':
+        # For planting: need some moisture but not too much
+        risk = np.where(precipitation_mm < 2, 15, np.where(precipitation_mm > 20, 10, 0))
+    elif activity == 'spraying':
+        # For spraying: need dry, low wind
+        risk = np.where(precipitation_probability > 30, 15, 0) + np.where(wind_speed_ms > 8, 15, 0)
+    else:
+        risk = np.zeros(np.shape(precipitation_mm), dtype=int)
+
+    return np.minimum(risk.sum(axis=-1), 100)
+
+
+def sliding_mean(values, window):
+    """Mean of every contiguous window of the given length (O(n) via cumulative sums)"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def top_windows(window_means, window, top):
+    """Start indices of the best non-overlapping windows, highest mean first"""
+    taken = np.zeros(len(window_means) + window - 1, dtype=bool)
+    starts = []
+    for start in np.argsort(-window_means, kind='stable').tolist():
+        if taken[start:start + window].any():
+            continue
+        starts.append(start)
+        taken[start:start + window] = True
+        if len(starts) >= top:
+            break
+    return starts
@@ -1,62 +1,250 @@
+import time
+
+# Boot-time measurement starts before the heavier imports below
+BOOT_STARTED = time.perf_counter()
+
 import csv
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+import json
 from flask_cors import CORS
 from io import StringIO
+import logging
+import math
+import numpy as np
 import os
-import requests
-from requests.auth import HTTPBasicAuth
+import random
+import threading
 
+# Load .env before the local modules below read their settings
 load_dotenv()
 
+import logging_setup
+logging_setup.configure()
+
+import analysis_engine
+import async_meteomatics_client
+import climatology_cache
+import climatology_store
+import columnar_export
+import export_store
+import gazetteer
+import meteomatics_client
+import metrics
+import prefetch
+import profiler
+import rate_limiter
+from response_cache import forecast_cache, historical_cache, normalize_coordinate
+from single_flight import SingleFlight, worker_lock
+
+logger = logging.getLogger(__name__)
+
 # Meteomatics API credentials
 METEOMATICS_USERNAME = os.getenv("MY_APP_USERNAME") 
 METEOMATICS_PASSWORD = os.getenv("MY_APP_PASSWORD") 
-METEOMATICS_BASE_URL = "https://api.meteomatics.com"
+# Point at fake_meteomatics.py for offline runs and benchmarks
+METEOMATICS_BASE_URL = os.getenv("METEOMATICS_BASE_URL", "https://api.meteomatics.com")
+# HTTP Basic auth as a plain tuple, so requests is only imported on first upstream call
+METEOMATICS_AUTH = (METEOMATICS_USERNAME or "", METEOMATICS_PASSWORD or "")
+
+# Maximum number of locations accepted by /api/forecast/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 2000))
+# Maximum number of cells evaluated by /api/forecast/grid
+GRID_MAX_CELLS = int(os.getenv("GRID_MAX_CELLS", 10000))
+# Longest date range scored by /api/historical-analysis/scan
+SCAN_MAX_DAYS = 366
+
+# 'sync' (default) or 'async': Meteomatics calls go through the thread pool, or are
+# multiplexed on this worker's shared asyncio loop and connection pool
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "sync")
+
+# Set once the module has finished importing
+BOOT_TIME_MS = None
+
+# Startup credentials probe: 'background' (default), 'blocking' or 'off'
+STARTUP_PROBE = os.getenv("STARTUP_PROBE", "off" if os.getenv('FLASK_ENV') == 'production' else "background")
+# Warn when importing the app takes longer than this
+BOOT_TIME_BUDGET_MS = float(os.getenv("BOOT_TIME_BUDGET_MS", 500))
+# Make /api/ready fail until the upstream probe has succeeded
+READY_REQUIRES_UPSTREAM = os.getenv("READY_REQUIRES_UPSTREAM", "false").lower() == "true"
 
 # Test credentials on startup
 def test_meteomatics_connection():
     """Test if Meteomatics credentials work"""
-    import requests
-    from requests.auth import HTTPBasicAuth
-    from datetime import datetime
-    
     test_url = f"{METEOMATICS_BASE_URL}/{datetime.utcnow().isoformat()}Z/t_2m:C/20,73/json"
     
     try:
-        response = requests.get(
+        response = meteomatics_client.get(
             test_url,
-            auth=HTTPBasicAuth(METEOMATICS_USERNAME, METEOMATICS_PASSWORD),
+            auth=METEOMATICS_AUTH,
             timeout=10
         )
         
         if response.status_code == 200:
-            print("✅ Meteomatics credentials VALID!")
+            logger.info("Meteomatics credentials valid")
             return True
         elif response.status_code == 401:
-            print("❌ Meteomatics credentials INVALID (401 Unauthorized)")
-            print(f"Username being used: {METEOMATICS_USERNAME}")
+            logger.error("Meteomatics credentials invalid (401 Unauthorized)",
+                         extra={'username': METEOMATICS_USERNAME})
             return False
         else:
-            print(f"⚠️ Meteomatics returned status: {response.status_code}")
+            logger.warning("Meteomatics probe returned status %s", response.status_code)
             return False
     except Exception as e:
-        print(f"❌ Connection error: {str(e)}")
+        logger.error("Meteomatics probe connection error: %s", e)
         return False
 
+
+# Result of the startup credentials probe, reported by /api/health and /api/ready
+upstream_probe = {'status': 'pending', 'checked_at': None}
+
+
+def run_upstream_probe():
+    with rate_limiter.priority(rate_limiter.BACKGROUND):
+        upstream_probe['status'] = 'ok' if test_meteomatics_connection() else 'failed'
+    upstream_probe['checked_at'] = datetime.utcnow().isoformat()
+
+
+def start_upstream_probe():
+    """Probe Meteomatics without holding up the boot path (unless STARTUP_PROBE=blocking)"""
+    if STARTUP_PROBE == 'off':
+        upstream_probe['status'] = 'disabled'
+    elif STARTUP_PROBE == 'blocking':
+        run_upstream_probe()
+    else:
+        threading.Thread(target=run_upstream_probe, name='meteomatics-probe', daemon=True).start()
+
+# Coalesce identical in-flight historical work
+historical_flight = SingleFlight()
+upstream_flight = SingleFlight()
+
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS"]}})
+CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "OPTIONS"], "expose_headers": ["Content-Disposition", "X-Request-ID"]}})
 
-# Health check endpoint
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_id = logging_setup.bind_request_id(request.headers.get('X-Request-ID'))
+    g.profile_format = profiler.requested_by(request)
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by route pattern, not raw path, to keep series bounded
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started')
+    if started is not None:
+        metrics.http_latency.observe(time.perf_counter() - started, endpoint)
+    metrics.http_requests.inc(endpoint, request.method, str(response.status_code))
+    if g.get('profile_id'):
+        response.headers['X-Profile-Id'] = g.profile_id
+    if g.get('request_id'):
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+# Health check endpoint (liveness)
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'ok',
         'message': 'WeatherWise API is running',
+        'boot_time_ms': BOOT_TIME_MS,
+        'upstream': upstream_probe,
+        'circuit_breaker': meteomatics_client.breaker.stats(),
         'timestamp': datetime.utcnow().isoformat()
     })
 
+# Metrics endpoint (Prometheus text format)
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    quota = rate_limiter.usage()
+    lines = metrics.gauge_lines(
+        'weatherwise_meteomatics_quota_used_today', 'Meteomatics calls made today (all workers)',
+        [((), quota['used_today'])]
+    ) + metrics.gauge_lines(
+        'weatherwise_meteomatics_quota_remaining_today', 'Meteomatics calls left in the daily quota',
+        [((), quota['remaining_today'])]
+    ) + metrics.gauge_lines(
+        'weatherwise_meteomatics_tokens_available', 'Per-minute tokens currently available',
+        [((), quota['tokens_available'])]
+    )
+    lines += [
+        '# HELP weatherwise_meteomatics_rate_limited_total Upstream calls refused by the rate limiter (this worker)',
+        '# TYPE weatherwise_meteomatics_rate_limited_total counter',
+    ]
+    for level, count in quota['denied'].items():
+        lines.append(f'weatherwise_meteomatics_rate_limited_total{{priority="{level}"}} {count}')
+
+    # Cache effectiveness, read from the caches' own counters at scrape time
+    caches = {
+        'forecast': forecast_cache.stats(),
+        'historical_analysis': historical_cache.stats(),
+        'climatology': climatology_cache.stats()
+    }
+    for field in ('hits', 'misses'):
+        name = f'weatherwise_cache_{field}_total'
+        lines += [f'# HELP {name} Cache {field} (this worker)', f'# TYPE {name} counter']
+        lines += [f'{name}{{cache="{cache}"}} {stats[field]}' for cache, stats in caches.items()]
+    lines += metrics.gauge_lines(
+        'weatherwise_cache_hit_ratio', 'Cache hit ratio since worker start',
+        [((cache,), stats['hit_ratio']) for cache, stats in caches.items()], ('cache',)
+    )
+    lines += metrics.gauge_lines(
+        'weatherwise_circuit_open', '1 while the Meteomatics circuit breaker refuses calls',
+        [((), int(meteomatics_client.breaker.is_open()))]
+    )
+
+    return Response(metrics.render(lines), mimetype='text/plain; version=0.0.4')
+
+# Stored request profiles (admin only)
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    if not profiler.authorized(request):
+        return jsonify({'error': 'Admin token required'}), 403
+    found = profiler.find(profile_id)
+    if found is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    
+    path, format_type = found
+    with open(path, 'rb') as f:
+        body = f.read()
+    mimetype = 'application/json' if format_type == 'speedscope' else 'application/octet-stream'
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={os.path.basename(path)}'
+    return response
+
+# Readiness endpoint: can this worker take traffic?
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    ready = BOOT_TIME_MS is not None
+    if READY_REQUIRES_UPSTREAM:
+        ready = ready and upstream_probe['status'] == 'ok'
+    
+    return jsonify({
+        'ready': ready,
+        'boot_time_ms': BOOT_TIME_MS,
+        'upstream': upstream_probe
+    }), 200 if ready else 503
+
+# Per-worker cache statistics
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'worker_pid': os.getpid(),
+        'response_caches': {
+            'forecast': forecast_cache.stats(),
+            'historical_analysis': historical_cache.stats()
+        },
+        'climatology_cache': climatology_cache.stats(),
+        'climatology_store': climatology_store.stats(),
+        'gazetteer': gazetteer.cache_stats(),
+        'prefetch': prefetch.stats(),
+        'single_flight': {
+            'historical_analysis': historical_flight.stats(),
+            'upstream': upstream_flight.stats()
+        }
+    })
+
 # Get forecast endpoint
 @app.route('/api/forecast', methods=['GET'])
 def get_forecast():
@@ -66,47 +254,210 @@ def get_forecast():
     activity = request.args.get('activity', 'harvest')
     crop = request.args.get('crop', 'wheat')
     
+    if not valid_coordinates(lat, lon):
+        return jsonify({'error': 'lat must be within -90..90 and lon within -180..180'}), 400
+    
     # For now, return sample data
     # We'll connect to Meteomatics API later
-    sample_data = generate_sample_forecast(lat, lon, activity, crop)
+    sample_data, export_id = cached_forecast_entry(lat, lon, activity, crop)
+    prefetch.record(normalize_coordinate(lat), normalize_coordinate(lon), activity, crop)
     
-    return jsonify(sample_data)
+    # Keep a server-side copy so downloads can reference it by ID
+    return jsonify({**sample_data, 'analysis_id': export_store.put(sample_data, export_id)})
 
-def generate_sample_forecast(lat, lon, activity, crop):
-    """Generate sample forecast data based on location"""
+
+def valid_coordinates(lat, lon):
+    """True when lat/lon parse as numbers within -90..90 and -180..180"""
+    try:
+        return -90 <= float(lat) <= 90 and -180 <= float(lon) <= 180
+    except (TypeError, ValueError):
+        return False
+
+
+def cached_forecast(lat, lon, activity, crop):
+    """Forecast response memoized per normalized (lat, lon, activity, crop, day)"""
+    return cached_forecast_entry(lat, lon, activity, crop)[0]
+
+
+def cached_forecast_entry(lat, lon, activity, crop):
+    """(forecast, export ID) as cached; the ID is hashed once when the entry is built"""
+    lat, lon = normalize_coordinate(lat), normalize_coordinate(lon)
+    if profiler.active():
+        return with_export_id(generate_sample_forecast(lat, lon, activity, crop))
+    return forecast_cache.get_or_compute(
+        forecast_cache_key(lat, lon, activity, crop),
+        lambda: with_export_id(generate_sample_forecast(lat, lon, activity, crop))
+    )
+
+
+def with_export_id(analysis):
+    return analysis, export_store.analysis_id(analysis)
+
+
+def forecast_cache_key(lat, lon, activity, crop):
+    return (lat, lon, activity, crop, datetime.now().strftime('%Y-%m-%d'))
+
+
+def refresh_forecast(lat, lon, activity, crop):
+    """Recompute a hot location's cached forecast before it expires (used by the prefetcher)"""
+    return forecast_cache.refresh(
+        forecast_cache_key(lat, lon, activity, crop),
+        lambda: with_export_id(generate_sample_forecast(lat, lon, activity, crop)),
+        min_ttl_seconds=prefetch.PREFETCH_INTERVAL_SECONDS * 1.5
+    )
+
+# Batch forecast endpoint
+@app.route('/api/forecast/batch', methods=['POST'])
+def forecast_batch():
+    """
+    7-day forecast and risk for many locations in one call
+    Body: {"items": [{"lat", "lon", "activity", "crop"}, ...], "format": "json" | "ndjson"}
+    A bad item gets an 'error' field instead of failing the whole batch
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    format_type = data.get('format', request.args.get('format', 'json'))
     
-    import random
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Too many items (max {BATCH_MAX_ITEMS})'}), 400
     
-    # Seed random with location so same location = same forecast
-    random.seed(f"{lat}{lon}")
+    if format_type == 'ndjson':
+        def generate():
+            for index, item in enumerate(items):
+                yield json.dumps(forecast_batch_item(index, item)) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
     
-    forecast = []
-    base_date = datetime.now()
+    return jsonify({
+        'count': len(items),
+        'results': [forecast_batch_item(index, item) for index, item in enumerate(items)]
+    })
+
+
+def forecast_batch_item(index, item):
+    """Forecast for one batch entry, reporting problems as a per-item error"""
+    try:
+        lat = float(item['lat'])
+        lon = float(item['lon'])
+        if not valid_coordinates(lat, lon):
+            raise ValueError('coordinates out of range')
+        activity = item.get('activity', 'harvest')
+        crop = item.get('crop', 'wheat')
+        return {'index': index, 'result': cached_forecast(lat, lon, activity, crop), 'error': None}
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        return {'index': index, 'result': None, 'error': f'Invalid item: {str(e) or type(e).__name__}'}
+
+
+# Grid/region risk endpoint
+@app.route('/api/forecast/grid', methods=['GET'])
+def forecast_grid():
+    """
+    Risk score for every cell of a bounding box
+    Parameters: bbox=min_lon,min_lat,max_lon,max_lat, step (degrees), activity, crop
+    Returns a flat row-major array (rows = latitude ascending) plus shape and origin
+    """
+    activity = request.args.get('activity', 'harvest')
+    crop = request.args.get('crop', 'wheat')
+    
+    try:
+        min_lon, min_lat, max_lon, max_lat = [float(v) for v in request.args.get('bbox', '').split(',')]
+        step = float(request.args.get('step', '0.1'))
+    except ValueError:
+        return jsonify({'error': 'bbox must be min_lon,min_lat,max_lon,max_lat and step a number'}), 400
+    
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat, step)):
+        return jsonify({'error': 'bbox and step must be finite numbers'}), 400
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        return jsonify({'error': 'bbox must lie within lat -90..90 and lon -180..180, min before max'}), 400
+    if step <= 0:
+        return jsonify({'error': 'step must be positive'}), 400
+    
+    rows = int(round((max_lat - min_lat) / step)) + 1
+    cols = int(round((max_lon - min_lon) / step)) + 1
+    if rows * cols > GRID_MAX_CELLS:
+        return jsonify({'error': f'Grid too large ({rows * cols} cells, max {GRID_MAX_CELLS})'}), 400
+    
+    risk = generate_forecast_grid(min_lat, min_lon, rows, cols, step, activity, crop)
+    
+    return jsonify({
+        'activity_type': activity,
+        'origin': {'lat': min_lat, 'lon': min_lon},
+        'step': step,
+        'shape': [rows, cols],
+        'values': risk.ravel().tolist(),
+        'generated_at': datetime.utcnow().isoformat()
+    })
+
+
+def generate_forecast_grid(min_lat, min_lon, rows, cols, step, activity, crop):
+    """
+    Risk scores for a rows x cols grid of cells starting at (min_lat, min_lon)
+    Uses the same seeded weather as /api/forecast so a cell matches its point forecast
+    """
+    days = RISK_WINDOW_DAYS
+    precip = np.empty((rows, cols, days))
+    precip_prob = np.empty((rows, cols, days))
+    soil = np.empty((rows, cols, days))
+    wind = np.empty((rows, cols, days))
+    
+    lats = [normalize_coordinate(min_lat + r * step) for r in range(rows)]
+    lons = [normalize_coordinate(min_lon + c * step) for c in range(cols)]
+    
+    for r, lat in enumerate(lats):
+        for c, lon in enumerate(lons):
+            for d, day in enumerate(simulate_forecast_days(lat, lon, days)):
+                precip[r, c, d] = day['precipitation_mm']
+                precip_prob[r, c, d] = day['precipitation_probability']
+                soil[r, c, d] = day['soil_moisture_index']
+                wind[r, c, d] = day['wind_speed_ms']
+    
+    return analysis_engine.risk_scores(precip, precip_prob, soil, wind, activity)
+
+
+def simulate_forecast_days(lat, lon, num_days=7):
+    """Seeded synthetic weather for the next num_days (same location = same values)"""
+    
+    # Per-call RNG seeded with location so same location = same forecast (thread-safe)
+    rng = random.Random(f"{lat}{lon}")
     
     # Different weather patterns based on latitude
     lat_float = float(lat)
     base_temp = 30 if lat_float < 20 else 25 if lat_float < 25 else 20
     rain_likelihood = 0.3 if lat_float < 20 else 0.5 if lat_float < 25 else 0.7
     
-    # Generate 7 days of forecast
-    for i in range(7):
-        date = base_date + timedelta(days=i)
-        
+    days = []
+    for i in range(num_days):
         # Random variation but consistent for same location
-        will_rain = random.random() < rain_likelihood
-        temp_variation = random.randint(-3, 5)
+        will_rain = rng.random() < rain_likelihood
+        temp_variation = rng.randint(-3, 5)
         
-        forecast.append({
-            'date': date.strftime('%Y-%m-%d'),
+        days.append({
             'temperature_c': base_temp + temp_variation,
-            'precipitation_mm': random.randint(10, 30) if will_rain else random.randint(0, 2),
-            'precipitation_probability': random.randint(60, 90) if will_rain else random.randint(5, 30),
-            'humidity_percent': random.randint(50, 80) if will_rain else random.randint(30, 50),
-            'wind_speed_ms': round(random.uniform(2, 12), 1),
-            'soil_moisture_index': random.uniform(0.5, 0.8) if will_rain else random.uniform(0.2, 0.4),
+            'precipitation_mm': rng.randint(10, 30) if will_rain else rng.randint(0, 2),
+            'precipitation_probability': rng.randint(60, 90) if will_rain else rng.randint(5, 30),
+            'humidity_percent': rng.randint(50, 80) if will_rain else rng.randint(30, 50),
+            'wind_speed_ms': round(rng.uniform(2, 12), 1),
+            'soil_moisture_index': rng.uniform(0.5, 0.8) if will_rain else rng.uniform(0.2, 0.4),
             'conditions': 'Rain Likely' if will_rain else 'Clear'
         })
     
+    return days
+
+
+@profiler.profiled('generate_sample_forecast')
+def generate_sample_forecast(lat, lon, activity, crop):
+    """Generate sample forecast data based on location"""
+    
+    base_date = datetime.now()
+    lat_float = float(lat)
+    
+    # Generate 7 days of forecast
+    forecast = [
+        {'date': (base_date + timedelta(days=i)).strftime('%Y-%m-%d'), **day}
+        for i, day in enumerate(simulate_forecast_days(lat, lon, 7))
+    ]
+    
     # Calculate risk score based on activity and weather
     risk_score = calculate_risk_score(forecast, activity, crop)
     
@@ -140,13 +491,17 @@ def generate_sample_forecast(lat, lon, activity, crop):
     return result
 
 
+# Number of forecast days that feed the risk score
+RISK_WINDOW_DAYS = 3
+
+
 def calculate_risk_score(forecast, activity, crop):
     """Calculate risk score based on activity type and weather"""
     
     risk = 0
     
     # Look at next 3 days
-    for day in forecast[:3]:
+    for day in forecast[:RISK_WINDOW_DAYS]:
         if activity in ['harvest', 'event']:
             # For harvest/events: rain is bad
             if day['precipitation_mm'] > 10:
@@ -258,6 +613,10 @@ def find_optimal_window(forecast):
 def get_location_name(lat, lon):
     """Get approximate location name from coordinates"""
     
+    # Nearest place from the gazetteer index when one has been built
+    if gazetteer.available():
+        return gazetteer.nearest_name(lat, lon) or f'Location ({lat:.1f}°, {lon:.1f}°)'
+    
     locations = {
         (20.0, 73.5): 'Nashik, Maharashtra, India',
         (18.5, 73.8): 'Pune, Maharashtra, India',
@@ -333,21 +692,245 @@ def historical_analysis():
     
     if not target_date:
         return jsonify({'error': 'Date parameter required'}), 400
+    if not valid_coordinates(lat, lon):
+        return jsonify({'error': 'lat must be within -90..90 and lon within -180..180'}), 400
     
     # Generate historical analysis
-    analysis = generate_historical_analysis(lat, lon, target_date, activity, crop)
+    analysis, export_id = cached_historical_entry(lat, lon, target_date, activity, crop)
+    prefetch.record(normalize_coordinate(lat), normalize_coordinate(lon), activity, crop)
     
-    return jsonify(analysis)
+    # Keep a server-side copy so downloads can reference it by ID
+    analysis_id = export_store.put(analysis, export_id)
+    with metrics.stage_latency.time('serialization'):
+        return jsonify({**analysis, 'analysis_id': analysis_id})
 
 
+def cached_historical_analysis(lat, lon, target_date, activity, crop):
+    """Historical analysis memoized per normalized (lat, lon, date, activity, crop)"""
+    return cached_historical_entry(lat, lon, target_date, activity, crop)[0]
+
+
+def cached_historical_entry(lat, lon, target_date, activity, crop):
+    """(analysis, export ID) as cached; the ID is hashed once when the entry is built"""
+    lat, lon = normalize_coordinate(lat), normalize_coordinate(lon)
+    if profiler.active():
+        return with_export_id(generate_historical_analysis(lat, lon, target_date, activity, crop))
+    key = (lat, lon, target_date, activity, crop)
+    return historical_cache.get_or_compute(
+        key, lambda: historical_flight.do(
+            key, lambda: with_export_id(generate_historical_analysis(lat, lon, target_date, activity, crop))
+        )
+    )
+
+
+# Headline statistics, answered from the precomputed climatology store when it covers the location
+@app.route('/api/historical-analysis/summary', methods=['GET'])
+def historical_summary():
+    lat = request.args.get('lat', '20.0')
+    lon = request.args.get('lon', '73.5')
+    target_date = request.args.get('date')  # Format: YYYY-MM-DD
+    activity = request.args.get('activity', 'harvest')
+    crop = request.args.get('crop', 'wheat')
+
+    try:
+        target = datetime.strptime(target_date or '', '%Y-%m-%d')
+        if not valid_coordinates(lat, lon):
+            raise ValueError('coordinates out of range')
+        lat, lon = normalize_coordinate(lat), normalize_coordinate(lon)
+    except ValueError:
+        return jsonify({'error': 'Valid lat, lon and date (YYYY-MM-DD) parameters required'}), 400
+
+    stats = climatology_store.lookup_stats(lat, lon, target.month, target.day)
+    if stats is not None and activity in climatology_store.ACTIVITIES:
+        summary = summary_from_store(stats, activity)
+    else:
+        summary = summary_from_analysis(cached_historical_analysis(lat, lon, target_date, activity, crop))
+
+    return jsonify({
+        'location': {'lat': float(lat), 'lon': float(lon), 'activity_type': activity, 'crop': crop},
+        'target_date': target_date,
+        **summary
+    })
+
+
+def summary_from_store(stats, activity):
+    """Summary fields from one day of precomputed store statistics"""
+    total_years = int(stats['years'])
+
+    def extreme(count):
+        return {'probability': round(count / total_years * 100, 1), 'occurrences': int(count)}
+
+    def per_decade(slope, digits):
+        return round(slope * 10, digits) if slope == slope else None  # NaN when too few years
+
+    return {
+        'source': 'precomputed',
+        'statistics': {
+            'rain_probability': round(stats['rain_probability'], 1),
+            'favorable_conditions_probability': round(stats[f'favorable_probability_{activity}'], 1),
+            'total_years_analyzed': total_years
+        },
+        'extreme_events': {
+            'extreme_heat': extreme(stats['extreme_heat_count']),
+            'extreme_rainfall': extreme(stats['extreme_rain_count'])
+        },
+        'climate_trends': {
+            'temperature_change_per_decade': per_decade(stats['temperature_slope'], 2),
+            'precipitation_change_per_decade': per_decade(stats['precipitation_slope'], 1)
+        }
+    }
+
+
+def summary_from_analysis(analysis):
+    """The same summary fields taken from a full historical analysis"""
+    statistics = analysis['statistics']
+    extreme_events = analysis['extreme_events']
+    trends = analysis['climate_trends']
+    return {
+        'source': 'live',
+        'data_source': analysis['data_source'],
+        'statistics': {
+            'rain_probability': statistics['rain_probability'],
+            'favorable_conditions_probability': statistics['favorable_conditions_probability'],
+            'total_years_analyzed': statistics['total_years_analyzed']
+        },
+        'extreme_events': {
+            name: {key: extreme_events[name][key] for key in ('probability', 'occurrences')}
+            for name in ('extreme_heat', 'extreme_rainfall')
+        },
+        'climate_trends': {
+            'temperature_change_per_decade': trends['temperature']['change_per_decade'] if trends else None,
+            'precipitation_change_per_decade': trends['precipitation']['change_per_decade'] if trends else None
+        }
+    }
+
+
+# Year-round optimal-date scanner
+@app.route('/api/historical-analysis/scan', methods=['GET'])
+def historical_scan():
+    """
+    Score every day in a date range from one bulk climatology load
+    Returns daily favorable probabilities and the top-N sliding windows
+    """
+    lat = request.args.get('lat', '20.0')
+    lon = request.args.get('lon', '73.5')
+    activity = request.args.get('activity', 'harvest')
+    
+    try:
+        start = datetime.strptime(request.args.get('start', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d')
+        end_arg = request.args.get('end')
+        end = datetime.strptime(end_arg, '%Y-%m-%d') if end_arg else start + timedelta(days=364)
+        window = int(request.args.get('window', 7))
+        top = int(request.args.get('top', 5))
+        if not valid_coordinates(lat, lon):
+            raise ValueError('coordinates out of range')
+        lat, lon = normalize_coordinate(lat), normalize_coordinate(lon)
+    except ValueError:
+        return jsonify({'error': 'Invalid lat, lon, start, end, window or top parameter'}), 400
+    
+    num_days = (end - start).days + 1
+    if num_days < 1 or num_days > SCAN_MAX_DAYS:
+        return jsonify({'error': f'Date range must cover 1 to {SCAN_MAX_DAYS} days'}), 400
+    if window < 1 or top < 1:
+        return jsonify({'error': 'window and top must be positive'}), 400
+    
+    key = ('scan', lat, lon, start.strftime('%Y-%m-%d'), num_days, activity, window, top)
+    scan = historical_cache.get_or_compute(
+        key, lambda: scan_optimal_dates(lat, lon, start, num_days, activity, window, top)
+    )
+    
+    return jsonify(scan)
+
+
+def scan_optimal_dates(lat, lon, start, num_days, activity, window, top):
+    """Daily favorable probability over a date range plus the best sliding windows"""
+    dates = [start + timedelta(days=i) for i in range(num_days)]
+    lat_float = float(lat)
+    records_by_day = load_climatology_range(lat, lon, start, num_days)
+    
+    favorable_probs = np.empty(num_days)
+    rain_probs = np.empty(num_days)
+    simulated_by_month = {}
+    real_days = 0
+    
+    for i, date in enumerate(dates):
+        records = records_by_day.get((date.month, date.day))
+        if records and len(records) >= 5:
+            columns = analysis_engine.to_columns(records)
+            favorable = analysis_engine.favorable_mask(columns['precipitation_mm'], columns['rained'], activity)
+            favorable_probs[i] = favorable.mean() * 100
+            rain_probs[i] = columns['rained'].mean() * 100
+            real_days += 1
+            continue
+        
+        # Simulated fallback uses the same seeded model as generate_historical_analysis
+        if date.month not in simulated_by_month:
+            _, _, _, rain_base_prob, temp_base = seasonal_baseline(lat_float, date.month)
+            rng = random.Random(f"{lat}{lon}{date.month}")
+            columns = analysis_engine.to_columns(
+                simulate_historical_years(rng, date.month, 1, activity, rain_base_prob, temp_base)
+            )
+            simulated_by_month[date.month] = (
+                columns['was_favorable'].mean() * 100,
+                columns['rained'].mean() * 100
+            )
+        favorable_probs[i], rain_probs[i] = simulated_by_month[date.month]
+    
+    window = min(window, num_days)
+    window_means = analysis_engine.sliding_mean(favorable_probs, window)
+    best_starts = analysis_engine.top_windows(window_means, window, top)
+    
+    return {
+        'location': {
+            'name': get_location_name(lat_float, float(lon)),
+            'lat': lat_float,
+            'lon': float(lon),
+            'activity_type': activity
+        },
+        'range': {
+            'start': dates[0].strftime('%Y-%m-%d'),
+            'end': dates[-1].strftime('%Y-%m-%d'),
+            'days': num_days
+        },
+        'window_days': window,
+        'data_source': 'meteomatics' if real_days == num_days else 'simulated' if real_days == 0 else 'mixed',
+        'daily': [
+            {
+                'date': date.strftime('%Y-%m-%d'),
+                'favorable_probability': round(float(favorable_probs[i]), 1),
+                'rain_probability': round(float(rain_probs[i]), 1)
+            }
+            for i, date in enumerate(dates)
+        ],
+        'top_windows': [
+            {
+                'rank': rank + 1,
+                'start': dates[s].strftime('%Y-%m-%d'),
+                'end': dates[s + window - 1].strftime('%Y-%m-%d'),
+                'average_favorable_probability': round(float(window_means[s]), 1)
+            }
+            for rank, s in enumerate(best_starts)
+        ],
+        'generated_at': datetime.utcnow().isoformat()
+    }
+
+
+@profiler.profiled('generate_historical_analysis')
 def generate_historical_analysis(lat, lon, target_date, activity, crop):
     """
     Generate historical weather analysis for planning months in advance
     Simulates 20 years of NASA satellite data analysis
     """
-    import random
-    from datetime import datetime
+    # Try to fetch real NASA data from Meteomatics
+    logger.debug("Fetching historical records", extra={'target_date': target_date})
+    with metrics.stage_latency.time('fetch'):
+        real_data = load_historical_records(lat, lon, target_date)
     
+    return build_historical_analysis(lat, lon, target_date, activity, crop, real_data)
+
+
+def build_historical_analysis(lat, lon, target_date, activity, crop, real_data):
+    """Historical analysis from already-loaded real records (or None to simulate)"""
     # Parse target date
     try:
         target = datetime.strptime(target_date, '%Y-%m-%d')
@@ -357,89 +940,65 @@ def generate_historical_analysis(lat, lon, target_date, activity, crop):
     month = target.month
     day = target.day
     
-    # Try to fetch real NASA data from Meteomatics
-    print(f"🛰️ Attempting to fetch real NASA data for {target_date}...")
-    real_data = fetch_real_meteomatics_data(lat, lon, target_date)
-    
-    if real_data and len(real_data) >= 5:
+    using_real_data = bool(real_data and len(real_data) >= 5)
+    if using_real_data:
         # Use real NASA data!
-        print(f"✅ Using {len(real_data)} years of REAL NASA satellite data")
-        historical_years = real_data
+        logger.info("Using real historical records", extra={'years': len(real_data)})
+        # Copy: coalesced callers share one real_data list and each marks it for its own activity
+        historical_years = [dict(year) for year in real_data]
         
         # Update favorable status based on activity
-        for year in historical_years:
-            if activity in ['harvest', 'event']:
-                year['was_favorable'] = not year['rained']
-            elif activity == 'planting':
-                year['was_favorable'] = year['precipitation_mm'] > 2 and year['precipitation_mm'] < 30
-            else:
-                year['was_favorable'] = year['precipitation_mm'] < 15
+        real_columns = analysis_engine.to_columns(historical_years)
+        favorable = analysis_engine.favorable_mask(
+            real_columns['precipitation_mm'], real_columns['rained'], activity
+        )
+        for year, was_favorable in zip(historical_years, favorable.tolist()):
+            year['was_favorable'] = was_favorable
     else:
         # Fallback to simulated data
-        print("⚠️ Using simulated data (real data unavailable)")
-        random.seed(f"{lat}{lon}{month}")
+        logger.warning("Using simulated historical data (real data unavailable)")
         historical_years = []
     
+    # Per-call RNG keyed by location and month keeps results identical across threads
+    rng = random.Random(f"{lat}{lon}{month}")
+    
     # Different patterns by location and season
     lat_float = float(lat)
-    
-    # Seasonal patterns
-    is_monsoon = month in [6, 7, 8, 9]  # Monsoon months in India
-    is_winter = month in [11, 12, 1, 2]
-    is_summer = month in [3, 4, 5]
-    
-    # Base probabilities adjusted by season and location
-    if lat_float < 20:  # Southern regions
-        rain_base_prob = 0.6 if is_monsoon else 0.2
-        temp_base = 32 if is_summer else 28 if is_monsoon else 25
-    elif lat_float < 25:  # Central regions
-        rain_base_prob = 0.7 if is_monsoon else 0.3 if is_winter else 0.15
-        temp_base = 30 if is_summer else 26 if is_monsoon else 20
-    else:  # Northern regions
-        rain_base_prob = 0.5 if is_monsoon else 0.4 if is_winter else 0.1
-        temp_base = 28 if is_summer else 24 if is_monsoon else 15
+    is_monsoon, is_winter, is_summer, rain_base_prob, temp_base = seasonal_baseline(lat_float, month)
     
     # Generate 20 years of data
-    for year in range(2004, 2024):
-        # Add yearly variation
-        year_variation = random.uniform(-0.1, 0.1)
-        rain_happened = random.random() < (rain_base_prob + year_variation)
-        
-        historical_years.append({
-            'year': year,
-            'date': f'{year}-{month:02d}-{day:02d}',
-            'rained': rain_happened,
-            'precipitation_mm': random.randint(15, 80) if rain_happened else random.randint(0, 5),
-            'temperature_c': temp_base + random.randint(-5, 7),
-            'was_favorable': not rain_happened if activity in ['harvest', 'event'] else rain_happened if activity == 'planting' else random.random() > 0.5
-        })
+    historical_years.extend(simulate_historical_years(rng, month, day, activity, rain_base_prob, temp_base))
     
-    # Calculate statistics
-    total_years = len(historical_years)
-    rainy_years = sum(1 for y in historical_years if y['rained'])
-    favorable_years = sum(1 for y in historical_years if y['was_favorable'])
+    # Calculate statistics (columnar, one pass over the arrays)
+    with metrics.stage_latency.time('stats'):
+        columns = analysis_engine.to_columns(historical_years)
+        stats = analysis_engine.summary_statistics(columns)
+    total_years = stats['total_years']
+    rainy_years = stats['rainy_years']
+    favorable_years = stats['favorable_years']
     
-    rain_probability = (rainy_years / total_years) * 100
-    favorable_probability = (favorable_years / total_years) * 100
+    rain_probability = stats['rain_probability']
+    favorable_probability = stats['favorable_probability']
     
-    avg_temp = sum(y['temperature_c'] for y in historical_years) / total_years
-    avg_precip_when_rain = sum(y['precipitation_mm'] for y in historical_years if y['rained']) / max(rainy_years, 1)
+    avg_temp = stats['average_temperature_c']
+    avg_precip_when_rain = stats['average_precipitation_when_rain_mm']
     
     # Calculate planning risk score (inverse of favorable probability)
     planning_risk_score = int(100 - favorable_probability)
 
     # Calculate extreme events probabilities  ← ADD THIS
-    extreme_events = calculate_extreme_events(historical_years, lat_float, month)
+    with metrics.stage_latency.time('extreme_events'):
+        extreme_events = calculate_extreme_events(historical_years, lat_float, month, columns)
     
     # Monthly pattern (for all days in the month)
     monthly_pattern = []
     for d in range(1, 32):
         try:
             test_date = datetime(2020, month, d)
-            random.seed(f"{lat}{lon}{month}{d}")
+            day_rng = random.Random(f"{lat}{lon}{month}{d}")
             monthly_pattern.append({
                 'day': d,
-                'rain_probability': min(100, max(0, rain_base_prob * 100 + random.randint(-15, 15)))
+                'rain_probability': min(100, max(0, rain_base_prob * 100 + day_rng.randint(-15, 15)))
             })
         except ValueError:
             continue  # Skip invalid dates (e.g., Feb 30)
@@ -447,6 +1006,9 @@ def generate_historical_analysis(lat, lon, target_date, activity, crop):
     # Get location name
     location_name = get_location_name(lat_float, float(lon))
     
+    with metrics.stage_latency.time('trends'):
+        climate_trends = calculate_climate_trends(historical_years, columns)
+    
     result = {
         'location': {
             'name': location_name,
@@ -458,6 +1020,8 @@ def generate_historical_analysis(lat, lon, target_date, activity, crop):
         'target_date': target_date,
         'months_in_advance': calculate_months_ahead(target_date),
         'analysis_period': '2004-2024 (20 years of NASA data)',
+        # Which path produced the numbers: live/cached Meteomatics records or the simulation fallback
+        'data_source': 'meteomatics' if using_real_data else 'simulated',
         'statistics': {
             'rain_probability': round(rain_probability, 1),
             'favorable_conditions_probability': round(favorable_probability, 1),
@@ -481,7 +1045,7 @@ def generate_historical_analysis(lat, lon, target_date, activity, crop):
             is_summer
         ),
         'extreme_events': extreme_events,
-        'climate_trends': calculate_climate_trends(historical_years),
+        'climate_trends': climate_trends,
         'data_sources': [
             'NASA GPM IMERG (Historical Precipitation - 20 years)',
             'NASA SMAP (Historical Soil Moisture)',
@@ -494,6 +1058,50 @@ def generate_historical_analysis(lat, lon, target_date, activity, crop):
     return result
 
 
+def seasonal_baseline(lat_float, month):
+    """
+    Seasonal flags and base rain probability / temperature for a latitude and month
+    Returns (is_monsoon, is_winter, is_summer, rain_base_prob, temp_base)
+    """
+    # Seasonal patterns
+    is_monsoon = month in [6, 7, 8, 9]  # Monsoon months in India
+    is_winter = month in [11, 12, 1, 2]
+    is_summer = month in [3, 4, 5]
+    
+    # Base probabilities adjusted by season and location
+    if lat_float < 20:  # Southern regions
+        rain_base_prob = 0.6 if is_monsoon else 0.2
+        temp_base = 32 if is_summer else 28 if is_monsoon else 25
+    elif lat_float < 25:  # Central regions
+        rain_base_prob = 0.7 if is_monsoon else 0.3 if is_winter else 0.15
+        temp_base = 30 if is_summer else 26 if is_monsoon else 20
+    else:  # Northern regions
+        rain_base_prob = 0.5 if is_monsoon else 0.4 if is_winter else 0.1
+        temp_base = 28 if is_summer else 24 if is_monsoon else 15
+    
+    return is_monsoon, is_winter, is_summer, rain_base_prob, temp_base
+
+
+def simulate_historical_years(rng, month, day, activity, rain_base_prob, temp_base):
+    """Simulate 20 years of records for one calendar day from the caller's seeded RNG"""
+    simulated = []
+    for year in range(2004, 2024):
+        # Add yearly variation
+        year_variation = rng.uniform(-0.1, 0.1)
+        rain_happened = rng.random() < (rain_base_prob + year_variation)
+        
+        simulated.append({
+            'year': year,
+            'date': f'{year}-{month:02d}-{day:02d}',
+            'rained': rain_happened,
+            'precipitation_mm': rng.randint(15, 80) if rain_happened else rng.randint(0, 5),
+            'temperature_c': temp_base + rng.randint(-5, 7),
+            'was_favorable': not rain_happened if activity in ['harvest', 'event'] else rain_happened if activity == 'planting' else rng.random() > 0.5
+        })
+    
+    return simulated
+
+
 def calculate_months_ahead(target_date):
     """Calculate how many months ahead the target date is"""
     try:
@@ -574,58 +1182,39 @@ def generate_planning_insights(rain_prob, favorable_prob, activity, month, is_mo
     
     return insights
 
-def calculate_extreme_events(historical_years, lat, month):
+def calculate_extreme_events(historical_years, lat, month, columns=None):
     """
     Calculate probabilities of extreme weather events
     Matches NASA's requirement for extreme conditions analysis
+    Pass precomputed analysis_engine columns to avoid rebuilding the arrays
     """
-    import random
-    
     total_years = len(historical_years)
     
-    # Define thresholds based on location
-    if lat < 20:  # Tropical/Southern
-        heat_threshold = 38  # 38°C = ~100°F
-        extreme_rain_threshold = 80  # mm
-        heatwave_temp = 36
-    elif lat < 25:  # Subtropical/Central
-        heat_threshold = 40  # 40°C = ~104°F
-        extreme_rain_threshold = 70
-        heatwave_temp = 38
-    else:  # Temperate/Northern
-        heat_threshold = 35  # 35°C = ~95°F
-        extreme_rain_threshold = 60
-        heatwave_temp = 32
+    heat_threshold, extreme_rain_threshold, heatwave_temp = extreme_thresholds(lat)
     
     # Seasonal adjustments
     is_summer = month in [4, 5, 6]
     is_monsoon = month in [7, 8, 9]
     
+    if columns is None:
+        columns = analysis_engine.to_columns(historical_years)
+    
     # Count extreme events in historical data
-    extreme_heat_count = 0
-    extreme_rain_count = 0
+    extreme_heat_count = analysis_engine.count_exceedances(columns['temperature_c'], heat_threshold)
+    extreme_rain_count = analysis_engine.count_exceedances(columns['precipitation_mm'], extreme_rain_threshold)
     heatwave_count = 0
     dangerous_wind_count = 0
     
-    for i, year in enumerate(historical_years):
-        # Extreme heat
-        if year['temperature_c'] > heat_threshold:
-            extreme_heat_count += 1
-        
-        # Extreme rainfall
-        if year['precipitation_mm'] > extreme_rain_threshold:
-            extreme_rain_count += 1
-        
+    # Multi-day heat and wind are simulated per year from seeded draws
+    for year in historical_years:
         # Heat wave (check if next 2 days also hot - simulate)
-        random.seed(f"{year['year']}{month}")
         if year['temperature_c'] > heatwave_temp:
-            if random.random() > 0.6:  # 40% chance of multi-day heat
+            if random.Random(f"{year['year']}{month}").random() > 0.6:  # 40% chance of multi-day heat
                 heatwave_count += 1
         
         # Dangerous winds (simulate based on season)
-        random.seed(f"{year['year']}{month}wind")
         wind_risk = 0.15 if is_monsoon else 0.05
-        if random.random() < wind_risk:
+        if random.Random(f"{year['year']}{month}wind").random() < wind_risk:
             dangerous_wind_count += 1
     
     # Calculate probabilities
@@ -680,6 +1269,16 @@ def calculate_extreme_events(historical_years, lat, month):
     }
 
 
+def extreme_thresholds(lat):
+    """(extreme heat °C, extreme rain mm, heat-wave °C) thresholds based on location"""
+    if lat < 20:  # Tropical/Southern
+        return 38, 80, 36  # 38°C = ~100°F
+    elif lat < 25:  # Subtropical/Central
+        return 40, 70, 38  # 40°C = ~104°F
+    else:  # Temperate/Northern
+        return 35, 60, 32  # 35°C = ~95°F
+
+
 def generate_extreme_events_summary(heat_prob, rain_prob, heatwave_prob, wind_prob):
     """Generate human-readable summary of extreme events"""
     
@@ -706,13 +1305,83 @@ def generate_extreme_events_summary(heat_prob, rain_prob, heatwave_prob, wind_pr
     
     return warnings
 
+# Parameters: temperature, precipitation, relative humidity, wind speed
+METEOMATICS_HISTORICAL_PARAMS = "t_2m:C,precip_24h:mm,relative_humidity_2m:p,wind_speed_10m:ms"
+HISTORICAL_YEARS = range(2014, 2024)  # Last 10 years
+# Years per upstream call; smaller chunks are fetched in parallel
+METEOMATICS_CHUNK_SIZE = int(os.getenv("METEOMATICS_CHUNK_SIZE", 10))
+
+
+def build_historical_timestamps(month, day, years=HISTORICAL_YEARS):
+    """
+    Build the list of (year, timestamp) pairs for the same calendar day in past years
+    Years where the date does not exist (e.g. Feb 29) are skipped
+    """
+    timestamps = []
+    for year in years:
+        try:
+            datetime(year, month, day)
+        except ValueError:
+            continue
+        timestamps.append((year, f"{year}-{month:02d}-{day:02d}T12:00:00Z"))
+    return timestamps
+
+
+def build_meteomatics_url(lat, lon, timestamps, params=METEOMATICS_HISTORICAL_PARAMS):
+    """Build a single Meteomatics time-series URL covering all the given timestamps"""
+    time_list = ",".join(timestamps)
+    return f"{METEOMATICS_BASE_URL}/{time_list}/{params}/{lat},{lon}/json"
+
+
+def parse_meteomatics_series(data):
+    """
+    Split a Meteomatics JSON response into per-date values
+    Returns {'YYYY-MM-DD': {parameter: value}}
+    """
+    values_by_date = {}
+    for item in data['data']:
+        param = item['parameter']
+        for entry in item['coordinates'][0]['dates']:
+            date_key = entry['date'][:10]
+            values_by_date.setdefault(date_key, {})[param] = entry['value']
+    return values_by_date
+
+
+def build_year_record(year, month, day, values):
+    """Convert raw Meteomatics values for one date into the per-year record shape"""
+    temp = None
+    precip = None
+    humidity = None
+    wind = None
+
+    for param, value in values.items():
+        if 't_2m:C' in param:
+            temp = value
+        elif 'precip_24h:mm' in param:
+            precip = value
+        elif 'relative_humidity' in param:
+            humidity = value
+        elif 'wind_speed' in param:
+            wind = value
+
+    return {
+        'year': year,
+        'date': f'{year}-{month:02d}-{day:02d}',
+        'temperature_c': round(temp, 1) if temp else 25,
+        'precipitation_mm': round(precip, 1) if precip else 0,
+        'humidity_percent': round(humidity, 0) if humidity else 50,
+        'wind_speed_ms': round(wind, 1) if wind else 3,
+        'rained': (precip > 5) if precip else False,
+        'was_favorable': True  # Will calculate based on activity
+    }
+
+
 def fetch_real_meteomatics_data(lat, lon, target_date):
     """
     Fetch real historical NASA data from Meteomatics API
     Returns actual satellite-based precipitation and temperature data
+    Past years are requested as multi-date time-series calls, fetched in parallel
     """
-    from datetime import datetime, timedelta
-    
     try:
         # Parse target date
         target = datetime.strptime(target_date, '%Y-%m-%d')
@@ -720,76 +1389,208 @@ def fetch_real_meteomatics_data(lat, lon, target_date):
         day = target.day
         
         # Fetch historical data for this date over past 10 years
-        historical_data = []
+        chunks, urls = plan_historical_requests(lat, lon, month, day)
         
-        for year in range(2014, 2024):  # Last 10 years
-            date_str = f"{year}-{month:02d}-{day:02d}T12:00:00Z"
-            
-            # Parameters: temperature, precipitation, relative humidity, wind speed
-            params = "t_2m:C,precip_24h:mm,relative_humidity_2m:p,wind_speed_10m:ms"
-            
-            # Build API URL
-            url = f"{METEOMATICS_BASE_URL}/{date_str}/{params}/{lat},{lon}/json"
+        # All chunks go out in parallel; whatever arrives before the deadline is used
+        responses = fetch_upstream(urls)
+        
+        return collect_year_records(chunks, urls, responses, month, day)
             
-            try:
-                response = requests.get(
-                    url,
-                    auth=HTTPBasicAuth(METEOMATICS_USERNAME, METEOMATICS_PASSWORD),
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Extract values
-                    temp = None
-                    precip = None
-                    humidity = None
-                    wind = None
-                    
-                    for item in data['data']:
-                        param = item['parameter']
-                        value = item['coordinates'][0]['dates'][0]['value']
-                        
-                        if 't_2m:C' in param:
-                            temp = value
-                        elif 'precip_24h:mm' in param:
-                            precip = value
-                        elif 'relative_humidity' in param:
-                            humidity = value
-                        elif 'wind_speed' in param:
-                            wind = value
-                    
-                    historical_data.append({
-                        'year': year,
-                        'date': f'{year}-{month:02d}-{day:02d}',
-                        'temperature_c': round(temp, 1) if temp else 25,
-                        'precipitation_mm': round(precip, 1) if precip else 0,
-                        'humidity_percent': round(humidity, 0) if humidity else 50,
-                        'wind_speed_ms': round(wind, 1) if wind else 3,
-                        'rained': (precip > 5) if precip else False,
-                        'was_favorable': True  # Will calculate based on activity
-                    })
-                    
-                    print(f"✅ Fetched data for {year}")
-                
-                else:
-                    print(f"⚠️ Failed to fetch data for {year}: {response.status_code}")
-                    
-            except Exception as e:
-                print(f"⚠️ Error fetching {year}: {str(e)}")
+    except Exception:
+        logger.exception("Error in fetch_real_meteomatics_data")
+        return None
+
+
+def fetch_upstream(urls):
+    """Fetch Meteomatics URLs in parallel through the transport selected by UPSTREAM_MODE"""
+    if UPSTREAM_MODE == 'async':
+        return async_meteomatics_client.fetch_all_blocking(urls, auth=METEOMATICS_AUTH)
+    return meteomatics_client.fetch_all(urls, auth=METEOMATICS_AUTH)
+
+
+def plan_historical_requests(lat, lon, month, day):
+    """Split the past years into chunks and build one Meteomatics URL per chunk"""
+    timestamps = build_historical_timestamps(month, day)
+    chunks = [timestamps[i:i + METEOMATICS_CHUNK_SIZE]
+              for i in range(0, len(timestamps), METEOMATICS_CHUNK_SIZE)]
+    urls = [build_meteomatics_url(lat, lon, [ts for _, ts in chunk]) for chunk in chunks]
+    return chunks, urls
+
+
+def collect_year_records(chunks, urls, responses, month, day):
+    """
+    Turn the upstream responses for each chunk back into per-year records
+    Returns None when fewer than 5 years came back
+    """
+    historical_data = []
+    
+    for chunk, url in zip(chunks, urls):
+        response = responses.get(url)
+        if response is None:
+            continue
+        
+        if response.status_code != 200:
+            logger.warning("Failed to fetch data for %s-%s: %s", chunk[0][0], chunk[-1][0], response.status_code)
+            continue
+        
+        try:
+            values_by_date = parse_meteomatics_series(response.json())
+        except Exception as e:
+            logger.warning("Error parsing data for %s-%s: %s", chunk[0][0], chunk[-1][0], e)
+            continue
+        
+        for year, ts in chunk:
+            values = values_by_date.get(ts[:10])
+            if not values:
+                logger.debug("No data returned for year", extra={'year': year})
                 continue
+            historical_data.append(build_year_record(year, month, day, values))
+            logger.debug("Parsed year record", extra={'year': year})
+    
+    historical_data.sort(key=lambda y: y['year'])
+    logger.info("Fetched historical records", extra={
+        'years': len(historical_data), 'responses': len(responses), 'requests': len(urls)
+    })
+    
+    if len(historical_data) >= 5:  # At least 5 years of data
+        return historical_data
+    else:
+        logger.warning("Insufficient historical data, falling back to simulation")
+        return None
+
+def load_historical_records(lat, lon, target_date):
+    """
+    Per-year historical records for a location and date
+    Served from the precomputed store or the persistent climatology cache,
+    fetched from Meteomatics on a miss
+    """
+    try:
+        target = datetime.strptime(target_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return fetch_real_meteomatics_data(lat, lon, target_date)
+    
+    records = stored_or_cached_records(lat, lon, target.month, target.day)
+    if records is not None:
+        return records
+    
+    key = climatology_cache.cache_key(lat, lon, target.month, target.day)
+    return upstream_flight.do(key, lambda: fetch_and_cache_records(lat, lon, target_date, target, key))
+
+
+def stored_or_cached_records(lat, lon, month, day):
+    """Records from the precomputed climatology store, then the climatology cache; None on a miss"""
+    records = climatology_store.lookup_records(lat, lon, month, day)
+    if records is not None:
+        logger.debug("Climatology store hit", extra={'month': month, 'day': day})
+        return records
+    
+    records = climatology_cache.get(lat, lon, month, day)
+    if records is not None:
+        logger.debug("Climatology cache hit", extra={'month': month, 'day': day})
+    return records
+
+
+def fetch_and_cache_records(lat, lon, target_date, target, key):
+    """Single upstream fetch per cell/day, shared across threads and (optionally) workers"""
+    with worker_lock(key) as locked:
+        if locked:
+            # Another worker may have filled the cache while we waited
+            records = climatology_cache.get(lat, lon, target.month, target.day)
+            if records is not None:
+                return records
         
-        if len(historical_data) >= 5:  # At least 5 years of data
-            print(f"✅ Successfully fetched {len(historical_data)} years of real NASA data")
-            return historical_data
-        else:
-            print("⚠️ Insufficient data, falling back to simulation")
-            return None
-            
+        # Fetch at the cell centre so the cached answer does not depend on which request came first
+        records = fetch_real_meteomatics_data(climatology_cache.snap(lat), climatology_cache.snap(lon), target_date)
+        if records:
+            climatology_cache.put(lat, lon, target.month, target.day, records)
+        return records
+
+
+def build_range_timestamps(start, num_days, years=HISTORICAL_YEARS):
+    """
+    Daily Meteomatics time ranges covering the same calendar days in each past year
+    A span crossing New Year is split at Dec 31 and both parts are mapped onto the
+    same past year, so every calendar day gets the years a single-day fetch would
+    """
+    last_day = start + timedelta(days=num_days - 1)
+    segments = []
+    while start <= last_day:
+        end = min(last_day, datetime(start.year, 12, 31))
+        segments.append((start, end))
+        start = end + timedelta(days=1)
+    
+    ranges = []
+    for year in years:
+        for first, last in segments:
+            first, last = same_day_in_year(first, year), same_day_in_year(last, year)
+            ranges.append(f"{first:%Y-%m-%d}T12:00:00Z--{last:%Y-%m-%d}T12:00:00Z:P1D")
+    return ranges
+
+
+def same_day_in_year(day, year):
+    try:
+        return day.replace(year=year)
+    except ValueError:
+        return day.replace(year=year, day=28)  # Feb 29 in a non-leap year
+
+
+def fetch_meteomatics_range(lat, lon, start, num_days, years=HISTORICAL_YEARS):
+    """
+    Fetch every past year's values for a span of days in one request
+    Returns {(month, day): [per-year records]}
+    """
+    url = build_meteomatics_url(lat, lon, build_range_timestamps(start, num_days, years))
+    responses = fetch_upstream([url])
+    response = responses.get(url)
+    if response is None or response.status_code != 200:
+        logger.warning("Failed to fetch climatology range: %s",
+                       response.status_code if response is not None else 'no response')
+        return {}
+    
+    records_by_day = {}
+    try:
+        for date_key, values in sorted(parse_meteomatics_series(response.json()).items()):
+            year, month, day = int(date_key[:4]), int(date_key[5:7]), int(date_key[8:10])
+            records_by_day.setdefault((month, day), []).append(build_year_record(year, month, day, values))
     except Exception as e:
-        print(f"❌ Error in fetch_real_meteomatics_data: {str(e)}")
-        return None
+        logger.warning("Error parsing climatology range: %s", e)
+        return {}
+    
+    logger.info("Fetched climatology range", extra={'days': len(records_by_day)})
+    return records_by_day
+
+
+def load_climatology_range(lat, lon, start, num_days):
+    """
+    Per-year records for every calendar day in a span
+    Stored and cached days are reused; the rest arrive in one bulk fetch
+    """
+    days = [(d.month, d.day) for d in (start + timedelta(days=i) for i in range(num_days))]
+    records_by_day = {}
+    missing = False
+    for month, day in days:
+        records = stored_or_cached_records(lat, lon, month, day)
+        if records is None:
+            missing = True
+        else:
+            records_by_day[(month, day)] = records
+    
+    if missing:
+        fetched = fetch_meteomatics_range(climatology_cache.snap(lat), climatology_cache.snap(lon), start, num_days)
+        for (month, day), records in fetched.items():
+            if (month, day) in records_by_day or len(records) < 5:
+                continue
+            climatology_cache.put(lat, lon, month, day, records)
+            records_by_day[(month, day)] = records
+    
+    return records_by_day
+
+
+def warm_climatology_cache(coordinates, dates):
+    """Pre-fetch historical records for (lat, lon) pairs and 'YYYY-MM-DD' dates"""
+    # Warm-up yields upstream quota to interactive requests
+    with rate_limiter.priority(rate_limiter.BACKGROUND):
+        return climatology_cache.warm(coordinates, dates, fetch_real_meteomatics_data)
 
 @app.route('/api/download', methods=['OPTIONS'])
 def download_options():
@@ -801,10 +1602,12 @@ def download_options():
     return response
 
 @app.route('/api/download', methods=['POST'])
+@profiler.profiled('download_data')
 def download_data():
     """
-    Generate downloadable file (CSV or JSON) with analysis results
+    Generate downloadable file (CSV, NDJSON or JSON) with analysis results
     NASA requirement: "users will desire the capability to download an output file"
+    Files are streamed in chunks so memory stays flat however many rows are written
     """
     
     data = request.json
@@ -814,117 +1617,270 @@ def download_data():
     if not analysis_data:
         return jsonify({'error': 'No data provided'}), 400
     
-    if format_type == 'csv':
-        # Generate CSV
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Write metadata
-        writer.writerow(['WeatherWise Analysis Report'])
-        writer.writerow(['Generated by NASA Space Apps Challenge 2025'])
-        writer.writerow([])
-        
-        # Location info
-        writer.writerow(['Location Information'])
-        if 'location' in analysis_data:
-            writer.writerow(['Name', analysis_data['location'].get('name', 'N/A')])
-            writer.writerow(['Latitude', analysis_data['location'].get('lat', 'N/A')])
-            writer.writerow(['Longitude', analysis_data['location'].get('lon', 'N/A')])
-            writer.writerow(['Activity', analysis_data['location'].get('activity_type', 'N/A')])
-            if analysis_data['location'].get('crop'):
-                writer.writerow(['Crop', analysis_data['location']['crop']])
-        writer.writerow([])
-        
-        # Statistics (only for historical data)
-        if 'statistics' in analysis_data:
-            writer.writerow(['Historical Statistics (20 Years)'])
-            writer.writerow(['Metric', 'Value'])
-            writer.writerow(['Rain Probability', f"{analysis_data['statistics']['rain_probability']}%"])
-            writer.writerow(['Favorable Conditions', f"{analysis_data['statistics']['favorable_conditions_probability']}%"])
-            writer.writerow(['Average Temperature', f"{analysis_data['statistics']['average_temperature_c']}°C"])
-            writer.writerow([])
-        
-        # Risk Analysis
-        if 'risk_analysis' in analysis_data:
-            writer.writerow(['Risk Analysis'])
-            writer.writerow(['Risk Score', f"{analysis_data['risk_analysis']['risk_score']}/100"])
-            writer.writerow(['Recommendation', analysis_data['risk_analysis']['recommendation']])
-            if 'confidence' in analysis_data['risk_analysis']:
-                writer.writerow(['Confidence', analysis_data['risk_analysis']['confidence']])
-            writer.writerow([])
-        
-        # Extreme Events (only for historical data)
-        if 'extreme_events' in analysis_data:
-            writer.writerow(['Extreme Events Analysis'])
-            writer.writerow(['Event Type', 'Probability', 'Severity', 'Occurrences'])
-            
-            ee = analysis_data['extreme_events']
-            writer.writerow(['Extreme Heat', f"{ee['extreme_heat']['probability']}%", 
-                           ee['extreme_heat']['severity'], ee['extreme_heat']['occurrences']])
-            writer.writerow(['Extreme Rainfall', f"{ee['extreme_rainfall']['probability']}%", 
-                           ee['extreme_rainfall']['severity'], ee['extreme_rainfall']['occurrences']])
-            writer.writerow(['Heat Wave', f"{ee['heat_wave']['probability']}%", 
-                           ee['heat_wave']['severity'], ee['heat_wave']['occurrences']])
-            writer.writerow(['Dangerous Winds', f"{ee['dangerous_winds']['probability']}%", 
-                           ee['dangerous_winds']['severity'], ee['dangerous_winds']['occurrences']])
-            writer.writerow([])
-        
-        # Forecast Data (for 7-day forecast mode)
-        if 'forecast' in analysis_data and not 'historical_data' in analysis_data:
-            writer.writerow(['7-Day Weather Forecast'])
-            writer.writerow(['Date', 'Temperature (°C)', 'Precipitation (mm)', 'Humidity (%)', 'Wind Speed (m/s)', 'Conditions'])
-            for day in analysis_data['forecast']:
-                writer.writerow([
-                    day.get('date', 'N/A'),
-                    day.get('temperature_c', 'N/A'),
-                    day.get('precipitation_mm', 'N/A'),
-                    day.get('humidity_percent', 'N/A'),
-                    day.get('wind_speed_ms', 'N/A'),
-                    day.get('conditions', 'N/A')
-                ])
-            writer.writerow([])
-        
-        # Historical Data (only for planning mode)
-        if 'historical_data' in analysis_data:
-            writer.writerow(['Historical Data'])
-            writer.writerow(['Year', 'Date', 'Temperature (°C)', 'Precipitation (mm)', 'Rained', 'Favorable'])
-            for year_data in analysis_data['historical_data']:
-                writer.writerow([
-                    year_data['year'],
-                    year_data['date'],
-                    year_data['temperature_c'],
-                    year_data['precipitation_mm'],
-                    'Yes' if year_data['rained'] else 'No',
-                    'Yes' if year_data['was_favorable'] else 'No'
-                ])
-            writer.writerow([])
-        
-        # Data Sources
-        if 'data_sources' in analysis_data:
-            writer.writerow(['Data Sources'])
-            for source in analysis_data['data_sources']:
-                writer.writerow([source])
-        
-        # Create CSV response
-        csv_content = output.getvalue()
-        filename = f'weatherwise_analysis_{analysis_data["location"]["name"].replace(" ", "_").replace(",", "")}.csv'
-        
-        response = make_response(csv_content)
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        return response
+    base_filename = download_base_filename(analysis_data)
+    
+    if format_type in ['csv', 'ndjson'] + columnar_export.COLUMNAR_FORMATS:
+        return render_download(analysis_data, format_type)
     
     else:  # JSON format
-        filename = f'weatherwise_analysis_{analysis_data["location"]["name"].replace(" ", "_").replace(",", "")}.json'
-        return jsonify({
+        payload = {
             'success': True,
             'format': 'json',
             'content': analysis_data,
-            'filename': filename
-        })
+            'filename': f'{base_filename}.json'
+        }
+        response = Response(stream_with_context(stream_json(payload)), mimetype='application/json')
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
 
-def calculate_climate_trends(historical_data):
+
+@app.route('/api/download/<analysis_id>', methods=['GET'])
+def download_by_id(analysis_id):
+    """
+    Render an export from the server-side copy of a computed analysis
+    The ID comes from the 'analysis_id' field of /api/forecast or /api/historical-analysis
+    """
+    format_type = request.args.get('format', 'json')
+    if format_type not in DOWNLOAD_FORMATS:
+        return jsonify({'error': f'Unsupported format (use one of {", ".join(DOWNLOAD_FORMATS)})'}), 400
+    
+    analysis_data, seconds_left = export_store.get(analysis_id)
+    if analysis_data is None:
+        return jsonify({'error': 'Analysis not found or expired'}), 404
+    
+    response = render_download(analysis_data, format_type, analysis_id)
+    # Content behind an ID never changes, so shared caches may keep it until expiry
+    response.headers['Cache-Control'] = f'public, max-age={seconds_left}, immutable'
+    return response
+
+
+@app.route('/api/download/columnar', methods=['POST'])
+def download_columnar():
+    """
+    Multi-location Parquet / Arrow IPC export
+    Body: {"ids": [analysis_id, ...], "data": [analysis, ...], "format": "parquet" | "arrow"}
+    Rows from every analysis land in the same typed per-section tables
+    """
+    data = request.get_json(silent=True) or {}
+    format_type = data.get('format', 'parquet')
+    if format_type not in columnar_export.COLUMNAR_FORMATS:
+        return jsonify({'error': f'Unsupported format (use one of {", ".join(columnar_export.COLUMNAR_FORMATS)})'}), 400
+    
+    analyses = []
+    for analysis_id in data.get('ids') or []:
+        analysis_data, _ = export_store.get(analysis_id)
+        if analysis_data is None:
+            return jsonify({'error': f'Analysis {analysis_id} not found or expired'}), 404
+        analyses.append((analysis_id, analysis_data))
+    for analysis_data in data.get('data') or []:
+        analyses.append((export_store.analysis_id(analysis_data), analysis_data))
+    
+    if not analyses:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    return columnar_download(analyses, format_type, 'weatherwise_export')
+
+
+# Formats served by /api/download/<analysis_id>
+DOWNLOAD_FORMATS = ['csv', 'json', 'ndjson'] + columnar_export.COLUMNAR_FORMATS
+
+
+def download_base_filename(analysis_data):
+    return f'weatherwise_analysis_{analysis_data["location"]["name"].replace(" ", "_").replace(",", "")}'
+
+
+def render_download(analysis_data, format_type, analysis_id=None):
+    """Streaming attachment response for an analysis in the requested format"""
+    base_filename = download_base_filename(analysis_data)
+    
+    if format_type in columnar_export.COLUMNAR_FORMATS:
+        analysis_id = analysis_id or export_store.analysis_id(analysis_data)
+        return columnar_download([(analysis_id, analysis_data)], format_type, base_filename)
+    elif format_type == 'csv':
+        return streaming_download(stream_csv(iter_csv_rows(analysis_data)), 'text/csv', f'{base_filename}.csv')
+    elif format_type == 'ndjson':
+        return streaming_download(stream_ndjson(iter_ndjson_records(analysis_data)),
+                                  'application/x-ndjson', f'{base_filename}.ndjson')
+    else:
+        return streaming_download(stream_json(analysis_data), 'application/json', f'{base_filename}.json')
+
+
+# Size of each chunk written to the client by streaming downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def streaming_download(chunks, content_type, filename):
+    """Wrap a chunk generator in a chunked attachment response"""
+    response = Response(stream_with_context(chunks), mimetype=content_type)
+    response.headers['Content-Type'] = content_type
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def columnar_download(analyses, format_type, base_filename):
+    """Zip of typed Parquet / Arrow IPC tables for one or more analyses"""
+    if not columnar_export.available():
+        return jsonify({'error': 'Columnar export requires pyarrow on the server'}), 501
+    
+    tables = columnar_export.build_tables(analyses)
+    archive = columnar_export.write_archive(tables, format_type)
+    
+    response = Response(archive, mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename={base_filename}_{format_type}.zip'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def buffer_chunks(pieces, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """Group small string pieces into chunks of roughly chunk_size characters"""
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(rows):
+    """Encode CSV rows one at a time through a small reusable buffer"""
+    output = StringIO()
+    writer = csv.writer(output)
+    
+    def lines():
+        for row in rows:
+            writer.writerow(row)
+            line = output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+            yield line
+    
+    return buffer_chunks(lines())
+
+
+def stream_ndjson(records):
+    """Encode one JSON object per line"""
+    return buffer_chunks(json.dumps(record) + '\n' for record in records)
+
+
+def stream_json(payload):
+    """Encode a JSON document incrementally"""
+    return buffer_chunks(json.JSONEncoder(ensure_ascii=False).iterencode(payload))
+
+
+def iter_csv_rows(analysis_data):
+    """Yield the rows of the CSV analysis report"""
+    
+    # Write metadata
+    yield ['WeatherWise Analysis Report']
+    yield ['Generated by NASA Space Apps Challenge 2025']
+    yield []
+    
+    # Location info
+    yield ['Location Information']
+    if 'location' in analysis_data:
+        yield ['Name', analysis_data['location'].get('name', 'N/A')]
+        yield ['Latitude', analysis_data['location'].get('lat', 'N/A')]
+        yield ['Longitude', analysis_data['location'].get('lon', 'N/A')]
+        yield ['Activity', analysis_data['location'].get('activity_type', 'N/A')]
+        if analysis_data['location'].get('crop'):
+            yield ['Crop', analysis_data['location']['crop']]
+    yield []
+    
+    # Statistics (only for historical data)
+    if 'statistics' in analysis_data:
+        yield ['Historical Statistics (20 Years)']
+        yield ['Metric', 'Value']
+        yield ['Rain Probability', f"{analysis_data['statistics']['rain_probability']}%"]
+        yield ['Favorable Conditions', f"{analysis_data['statistics']['favorable_conditions_probability']}%"]
+        yield ['Average Temperature', f"{analysis_data['statistics']['average_temperature_c']}°C"]
+        yield []
+    
+    # Risk Analysis
+    if 'risk_analysis' in analysis_data:
+        yield ['Risk Analysis']
+        yield ['Risk Score', f"{analysis_data['risk_analysis']['risk_score']}/100"]
+        yield ['Recommendation', analysis_data['risk_analysis']['recommendation']]
+        if 'confidence' in analysis_data['risk_analysis']:
+            yield ['Confidence', analysis_data['risk_analysis']['confidence']]
+        yield []
+    
+    # Extreme Events (only for historical data)
+    if 'extreme_events' in analysis_data:
+        yield ['Extreme Events Analysis']
+        yield ['Event Type', 'Probability', 'Severity', 'Occurrences']
+        
+        ee = analysis_data['extreme_events']
+        yield ['Extreme Heat', f"{ee['extreme_heat']['probability']}%", 
+               ee['extreme_heat']['severity'], ee['extreme_heat']['occurrences']]
+        yield ['Extreme Rainfall', f"{ee['extreme_rainfall']['probability']}%", 
+               ee['extreme_rainfall']['severity'], ee['extreme_rainfall']['occurrences']]
+        yield ['Heat Wave', f"{ee['heat_wave']['probability']}%", 
+               ee['heat_wave']['severity'], ee['heat_wave']['occurrences']]
+        yield ['Dangerous Winds', f"{ee['dangerous_winds']['probability']}%", 
+               ee['dangerous_winds']['severity'], ee['dangerous_winds']['occurrences']]
+        yield []
+    
+    # Forecast Data (for 7-day forecast mode)
+    if 'forecast' in analysis_data and not 'historical_data' in analysis_data:
+        yield ['7-Day Weather Forecast']
+        yield ['Date', 'Temperature (°C)', 'Precipitation (mm)', 'Humidity (%)', 'Wind Speed (m/s)', 'Conditions']
+        for day in analysis_data['forecast']:
+            yield [
+                day.get('date', 'N/A'),
+                day.get('temperature_c', 'N/A'),
+                day.get('precipitation_mm', 'N/A'),
+                day.get('humidity_percent', 'N/A'),
+                day.get('wind_speed_ms', 'N/A'),
+                day.get('conditions', 'N/A')
+            ]
+        yield []
+    
+    # Historical Data (only for planning mode)
+    if 'historical_data' in analysis_data:
+        yield ['Historical Data']
+        yield ['Year', 'Date', 'Temperature (°C)', 'Precipitation (mm)', 'Rained', 'Favorable']
+        for year_data in analysis_data['historical_data']:
+            yield [
+                year_data['year'],
+                year_data['date'],
+                year_data['temperature_c'],
+                year_data['precipitation_mm'],
+                'Yes' if year_data['rained'] else 'No',
+                'Yes' if year_data['was_favorable'] else 'No'
+            ]
+        yield []
+    
+    # Data Sources
+    if 'data_sources' in analysis_data:
+        yield ['Data Sources']
+        for source in analysis_data['data_sources']:
+            yield [source]
+
+
+def iter_ndjson_records(analysis_data):
+    """Yield one flat record per line: a summary first, then one per forecast day or historical year"""
+    location = analysis_data.get('location', {})
+    summary = {'record_type': 'summary', 'location': location}
+    for key in ('target_date', 'statistics', 'planning_risk_score', 'recommendation',
+                'risk_analysis', 'extreme_events', 'climate_trends', 'data_sources', 'generated_at'):
+        if key in analysis_data:
+            summary[key] = analysis_data[key]
+    yield summary
+    
+    if 'historical_data' in analysis_data:
+        for year_data in analysis_data['historical_data']:
+            yield {'record_type': 'historical_year', **year_data}
+    elif 'forecast' in analysis_data:
+        for day in analysis_data['forecast']:
+            yield {'record_type': 'forecast_day', **day}
+
+def calculate_climate_trends(historical_data, columns=None):
     """
     Analyze climate trends over the historical period
     Addresses NASA requirement: "data capture trends too"
@@ -932,24 +1888,19 @@ def calculate_climate_trends(historical_data):
     if len(historical_data) < 5:
         return None
     
-    years = [d['year'] for d in historical_data]
-    temps = [d['temperature_c'] for d in historical_data]
-    precips = [d['precipitation_mm'] for d in historical_data]
+    if columns is None:
+        columns = analysis_engine.to_columns(historical_data)
+    years = columns['year']
     
-    # Simple linear trend calculation
-    n = len(years)
+    # Least-squares trend for temperature and precipitation in one pass
+    temp_slope, precip_slope = analysis_engine.linear_slopes(
+        years,
+        np.column_stack([columns['temperature_c'], columns['precipitation_mm']])
+    ).tolist()
     
-    # Temperature trend
-    temp_slope = (n * sum(y*t for y,t in zip(years, temps)) - sum(years) * sum(temps)) / \
-                 (n * sum(y*y for y in years) - sum(years)**2)
-    
-    temp_change = temp_slope * (years[-1] - years[0])
-    
-    # Precipitation trend
-    precip_slope = (n * sum(y*p for y,p in zip(years, precips)) - sum(years) * sum(precips)) / \
-                   (n * sum(y*y for y in years) - sum(years)**2)
-    
-    precip_change = precip_slope * (years[-1] - years[0])
+    span = float(years[-1] - years[0])
+    temp_change = temp_slope * span
+    precip_change = precip_slope * span
     
     # Determine trend significance
     temp_trend = 'INCREASING' if temp_slope > 0.1 else 'DECREASING' if temp_slope < -0.1 else 'STABLE'
@@ -1011,13 +1962,17 @@ def generate_climate_summary(temp_trend, precip_trend, temp_change, precip_chang
     
     return summaries
 
+# Boot finished: record how long the import took and probe upstream off the boot path
+BOOT_TIME_MS = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+if BOOT_TIME_MS > BOOT_TIME_BUDGET_MS:
+    logger.warning("Boot took %sms (budget %.0fms)", BOOT_TIME_MS, BOOT_TIME_BUDGET_MS)
+start_upstream_probe()
+# Keep the busiest locations warm (PREFETCH_MODE=thread), or just count queries for a sidecar (track)
+prefetch.start(load_climatology_range, refresh_forecast)
+
 if __name__ == '__main__':
     print('🚀 Starting WeatherWise Flask API...')
     
-    # Only test connection in development
-    if os.getenv('FLASK_ENV') != 'production':
-        test_meteomatics_connection()
-    
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_ENV') != 'production'
     
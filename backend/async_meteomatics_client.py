@@ -0,0 +1,155 @@
+"""
+Asyncio Meteomatics upstream client
+One long-lived event loop per worker process runs in a background thread and
+owns a single pooled httpx.AsyncClient. Request threads hand their upstream
+calls to that loop (fetch_all_blocking), so all in-flight upstream calls of a
+worker are multiplexed over one connection pool instead of one pool thread per call.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+
+import metrics
+import rate_limiter
+from circuit_breaker import CircuitOpenError
+from meteomatics_client import METEOMATICS_DEADLINE_SECONDS, breaker, record_latency, record_response
+
+logger = logging.getLogger(__name__)
+
+ASYNC_METEOMATICS_MAX_CONNECTIONS = int(os.getenv("ASYNC_METEOMATICS_MAX_CONNECTIONS", 100))
+
+_loop = None
+_loop_pid = None
+_client = None
+_lock = threading.Lock()
+
+
+def get_loop():
+    """Return this process's upstream event loop, starting its thread on first use (and after fork)"""
+    global _loop, _loop_pid, _client
+    if _loop is None or _loop_pid != os.getpid():
+        with _lock:
+            if _loop is None or _loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='meteomatics-async', daemon=True).start()
+                # A loop inherited through fork has no thread running it; start over
+                _loop, _loop_pid, _client = loop, os.getpid(), None
+    return _loop
+
+
+def get_client():
+    """Return the pooled client; only called on the upstream loop, which it is bound to"""
+    global _client
+    if _client is None:
+        # httpx is imported here to keep it off the boot path of sync deployments
+        import httpx
+
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_METEOMATICS_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_METEOMATICS_MAX_CONNECTIONS
+            ),
+            timeout=METEOMATICS_DEADLINE_SECONDS
+        )
+    return _client
+
+
+async def get(url, auth, timeout=METEOMATICS_DEADLINE_SECONDS):
+    """Single GET through the pooled client, refused while the circuit is open"""
+    # Breaker first, so refused calls do not spend shared quota
+    if not breaker.allow_request():
+        metrics.upstream_requests.inc('circuit_open')
+        raise CircuitOpenError('Meteomatics circuit is open')
+    try:
+        await rate_limiter.acquire_async()
+    except (rate_limiter.RateLimitedError, asyncio.CancelledError) as e:
+        breaker.release_request()
+        if isinstance(e, rate_limiter.RateLimitedError):
+            metrics.upstream_requests.inc('rate_limited')
+        raise
+    started = time.perf_counter()
+    try:
+        response = await get_client().get(url, auth=auth, timeout=timeout)
+    except (Exception, asyncio.CancelledError):
+        # Cancellation here means the overall deadline passed
+        record_latency('error', started)
+        breaker.record_failure()
+        raise
+    record_latency(str(response.status_code), started)
+    record_response(response)
+    return response
+
+
+async def fetch_all(urls, auth, deadline=METEOMATICS_DEADLINE_SECONDS):
+    """
+    Fetch several URLs concurrently and stop waiting once the overall deadline passes
+    Returns {url: response} for every call that finished in time; runs on the upstream loop
+    """
+    if not urls:
+        return {}
+    if breaker.is_open():
+        breaker.record_short_circuit()
+        logger.warning("Meteomatics circuit open - skipping upstream calls")
+        return {}
+
+    started = time.monotonic()
+    tasks = {asyncio.ensure_future(get(url, auth, deadline)): url for url in urls}
+
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+
+    responses = {}
+    for task in done:
+        try:
+            responses[tasks[task]] = task.result()
+        except Exception as e:
+            logger.warning("Upstream call failed: %s", e)
+
+    if pending:
+        elapsed = time.monotonic() - started
+        logger.warning("Deadline of %ss reached after %.1fs - %d of %d upstream calls dropped",
+                       deadline, elapsed, len(pending), len(urls))
+
+    return responses
+
+
+def _submit(urls, auth, deadline):
+    # The caller's context (rate-limit priority) is not visible on the loop thread, so pass it along
+    level = rate_limiter.current_priority()
+
+    async def run():
+        with rate_limiter.priority(level):
+            return await fetch_all(urls, auth, deadline)
+
+    return asyncio.run_coroutine_threadsafe(run(), get_loop())
+
+
+def fetch_all_blocking(urls, auth, deadline=METEOMATICS_DEADLINE_SECONDS):
+    """fetch_all for request threads: runs on the upstream loop and waits for the result"""
+    if not urls:
+        return {}
+    # fetch_all enforces the deadline itself; the margin only covers loop hand-off
+    return _submit(urls, auth, deadline).result(deadline + 5)
+
+
+def close():
+    """Close the pooled client and stop the upstream loop"""
+    global _loop, _client
+    with _lock:
+        loop, client = _loop, _client
+        _loop = _client = None
+    if loop is None or _loop_pid != os.getpid():
+        return
+    if client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
+        except Exception as e:
+            logger.warning("Closing the upstream client failed: %s", e)
+    loop.call_soon_threadsafe(loop.stop)
+
+
+atexit.register(close)
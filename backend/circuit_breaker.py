@@ -0,0 +1,111 @@
+"""
+Circuit breaker for upstream calls
+Tracks the failure rate over recent calls; once it trips, calls are refused
+for a cool-down period so callers fall back immediately instead of waiting
+on timeouts. After the cool-down a single trial call decides whether to close.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", 5))
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", 20))
+CIRCUIT_COOL_DOWN_SECONDS = float(os.getenv("CIRCUIT_COOL_DOWN_SECONDS", 30))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit is open"""
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker with closed, open and half-open states"""
+
+    def __init__(self, name, failure_rate=CIRCUIT_FAILURE_RATE, min_calls=CIRCUIT_MIN_CALLS,
+                 window=CIRCUIT_WINDOW, cool_down=CIRCUIT_COOL_DOWN_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cool_down = cool_down
+        self.state = CLOSED
+        self.opened_at = None
+        self.short_circuited = 0
+        self._outcomes = deque(maxlen=window)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """True if a call may go upstream now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cool_down:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def is_open(self):
+        """True while calls would be refused (without consuming a half-open trial)"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at < self.cool_down
+            return self.state == HALF_OPEN and self._trial_in_flight
+
+    def record_short_circuit(self):
+        """Count a call the caller skipped because is_open() was True"""
+        with self._lock:
+            self.short_circuited += 1
+
+    def release_request(self):
+        """Give back a permit from allow_request() for a call that never went upstream"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                logger.info("Circuit '%s' closed - upstream recovered", self.name)
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._trial_in_flight = False
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._trip()
+
+    def _trip(self):
+        logger.warning("Circuit '%s' opened - using fallback for %.0fs", self.name, self.cool_down)
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+        self._outcomes.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': self._outcomes.count(False),
+                'short_circuited': self.short_circuited,
+                'cool_down_seconds': self.cool_down
+            }
@@ -0,0 +1,169 @@
+"""
+Persistent climatology cache
+Stores the parsed per-year historical records keyed by snapped grid cell and
+month/day, so past years are fetched from Meteomatics at most once. Records are
+fetched at the cell centre, so every request in a cell gets the same answer
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLIMATOLOGY_CACHE_PATH = os.getenv(
+    "CLIMATOLOGY_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "climatology_cache.sqlite3")
+)
+CLIMATOLOGY_GRID_RESOLUTION = float(os.getenv("CLIMATOLOGY_GRID_RESOLUTION", 0.1))  # degrees
+CLIMATOLOGY_CACHE_MAX_ENTRIES = int(os.getenv("CLIMATOLOGY_CACHE_MAX_ENTRIES", 50000))
+# Hits refresh last_access at most this often, so readers rarely need the write lock
+CLIMATOLOGY_CACHE_TOUCH_SECONDS = float(os.getenv("CLIMATOLOGY_CACHE_TOUCH_SECONDS", 3600))
+
+_stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+_stats_lock = threading.Lock()
+_initialized = False
+
+
+def snap(value, resolution=None):
+    """Snap a coordinate to the centre of its grid cell"""
+    resolution = resolution or CLIMATOLOGY_GRID_RESOLUTION
+    return round(round(float(value) / resolution) * resolution, 6)
+
+
+def cache_key(lat, lon, month, day):
+    """Build the cache key for a location and calendar day"""
+    return f"{snap(lat):.6f},{snap(lon):.6f},{month:02d}-{day:02d}"
+
+
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(CLIMATOLOGY_CACHE_PATH, timeout=5)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS climatology ("
+            " key TEXT PRIMARY KEY,"
+            " records TEXT NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON climatology (last_access)")
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def get(lat, lon, month, day):
+    """Return the cached per-year records for this cell/day, or None"""
+    key = cache_key(lat, lon, month, day)
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT records, last_access FROM climatology WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and now - row[1] >= CLIMATOLOGY_CACHE_TOUCH_SECONDS:
+                conn.execute("UPDATE climatology SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Climatology cache read failed: %s", e)
+        row = None
+
+    if row is None:
+        _count('misses')
+        return None
+
+    _count('hits')
+    return json.loads(row[0])
+
+
+def put(lat, lon, month, day, records):
+    """Store per-year records for this cell/day, evicting least recently used entries"""
+    key = cache_key(lat, lon, month, day)
+    try:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO climatology (key, records, last_access) VALUES (?, ?, ?)",
+                (key, json.dumps(records), time.time())
+            )
+            evicted = conn.execute(
+                "DELETE FROM climatology WHERE key IN ("
+                " SELECT key FROM climatology ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (CLIMATOLOGY_CACHE_MAX_ENTRIES,)
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Climatology cache write failed: %s", e)
+        return
+
+    _count('writes')
+    if evicted > 0:
+        _count('evictions', evicted)
+
+
+def size():
+    """Number of cached cell/day entries"""
+    try:
+        conn = _connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM climatology").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return 0
+
+
+def stats():
+    """Hit/miss counters for this worker plus the shared entry count"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = snapshot['hits'] + snapshot['misses']
+    snapshot['hit_ratio'] = round(snapshot['hits'] / lookups, 3) if lookups else 0.0
+    snapshot['entries'] = size()
+    snapshot['max_entries'] = CLIMATOLOGY_CACHE_MAX_ENTRIES
+    snapshot['grid_resolution'] = CLIMATOLOGY_GRID_RESOLUTION
+    return snapshot
+
+
+def warm(coordinates, dates, fetcher):
+    """
+    Pre-fill the cache for a list of (lat, lon) pairs and 'YYYY-MM-DD' dates
+    fetcher(lat, lon, date) must return per-year records or None
+    Returns the number of entries fetched
+    """
+    fetched = 0
+    for lat, lon in coordinates:
+        # Fetch at the cell centre, the point every request in this cell is answered with
+        lat, lon = snap(lat), snap(lon)
+        for date in dates:
+            month, day = int(date[5:7]), int(date[8:10])
+            key = cache_key(lat, lon, month, day)
+            if _exists(key):
+                continue
+            records = fetcher(lat, lon, date)
+            if records:
+                put(lat, lon, month, day, records)
+                fetched += 1
+    return fetched
+
+
+def _exists(key):
+    try:
+        conn = _connect()
+        try:
+            return conn.execute("SELECT 1 FROM climatology WHERE key = ?", (key,)).fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
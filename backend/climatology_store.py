@@ -0,0 +1,356 @@
+"""
+Precomputed, memory-mapped climatology store for the service region
+An offline build fetches every past year for each grid point of a region
+once and writes two flat arrays:
+- records: per grid point, day of year and year, the same fields as the
+  live per-year records (NaN marks a year with no data)
+- stats: per grid point and day of year, rain probability, favorable
+  probability per activity, extreme-event counts and trend slopes
+Workers open them with mmap, so a lookup is an array index instead of an
+upstream fetch, and all gunicorn workers share one copy. Points outside the
+region (or not yet filled) fall back to the live path. When a new year of
+data arrives, add-year fetches only that year and recomputes the stats.
+
+Usage:
+    python climatology_store.py build --bounds 18,22,72,76 --resolution 0.25 --years 2014-2023
+    python climatology_store.py build --resume ...     # continue an interrupted build
+    python climatology_store.py add-year 2024 --keep 10
+    python climatology_store.py info
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime
+
+import numpy as np
+
+import analysis_engine
+
+logger = logging.getLogger(__name__)
+
+CLIMATOLOGY_STORE_PATH = os.getenv(
+    "CLIMATOLOGY_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "climatology_store")
+)
+
+RECORD_FIELDS = ['temperature_c', 'precipitation_mm', 'humidity_percent', 'wind_speed_ms', 'rained']
+ACTIVITIES = ['harvest', 'planting', 'spraying', 'event']
+STAT_FIELDS = (
+    ['years', 'rain_probability']
+    + [f'favorable_probability_{activity}' for activity in ACTIVITIES]
+    + ['extreme_heat_count', 'extreme_rain_count', 'temperature_slope', 'precipitation_slope']
+)
+DAYS_PER_YEAR = 366  # Day-of-year slots on a leap-year calendar, so Feb 29 has its own slot
+MIN_YEARS = 5  # Same minimum the live path needs before trusting real data
+
+_store = None
+_missing = False
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def day_of_year(month, day):
+    return (date(2020, month, day) - date(2020, 1, 1)).days
+
+
+class ClimatologyStore:
+    """Read-only view over a built store directory"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.records = np.load(os.path.join(path, 'records.npy'), mmap_mode='r')
+        self.stats = np.load(os.path.join(path, 'stats.npy'), mmap_mode='r')
+        self.years = self.meta['years']
+
+    def grid_index(self, lat, lon):
+        """(row, col) of the nearest grid point, or None outside the region"""
+        meta = self.meta
+        row = round((float(lat) - meta['lat_min']) / meta['resolution'])
+        col = round((float(lon) - meta['lon_min']) / meta['resolution'])
+        if 0 <= row < meta['n_lat'] and 0 <= col < meta['n_lon']:
+            return row, col
+        return None
+
+    def year_records(self, lat, lon, month, day):
+        cell = self.grid_index(lat, lon)
+        if cell is None:
+            return None
+        values = self.records[cell[0], cell[1], day_of_year(month, day)]
+        records = []
+        for year, (temp, precip, humidity, wind, rained) in zip(self.years, values.tolist()):
+            if temp != temp:  # NaN: no data for this year
+                continue
+            # Round back to the precision of the live records (stored as float32)
+            records.append({
+                'year': year,
+                'date': f'{year}-{month:02d}-{day:02d}',
+                'temperature_c': round(temp, 1),
+                'precipitation_mm': round(precip, 1),
+                'humidity_percent': round(humidity, 0),
+                'wind_speed_ms': round(wind, 1),
+                'rained': bool(rained),
+                'was_favorable': True  # Will calculate based on activity
+            })
+        return records if len(records) >= MIN_YEARS else None
+
+    def day_stats(self, lat, lon, month, day):
+        cell = self.grid_index(lat, lon)
+        if cell is None:
+            return None
+        values = dict(zip(STAT_FIELDS, self.stats[cell[0], cell[1], day_of_year(month, day)].tolist()))
+        if not values['years'] or values['years'] < MIN_YEARS:
+            return None
+        return values
+
+
+def get_store():
+    """Open the store on first use; None when none has been built"""
+    global _store, _missing
+    if _store is None and not _missing:
+        with _lock:
+            if _store is None and not _missing:
+                if os.path.exists(os.path.join(CLIMATOLOGY_STORE_PATH, 'meta.json')):
+                    _store = ClimatologyStore(CLIMATOLOGY_STORE_PATH)
+                else:
+                    _missing = True
+    return _store
+
+
+def _count(hit):
+    with _lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def lookup_records(lat, lon, month, day):
+    """Per-year records for a location and calendar day, or None if the store cannot answer"""
+    store = get_store()
+    if store is None:
+        return None
+    records = store.year_records(lat, lon, month, day)
+    _count(records is not None)
+    return records
+
+
+def lookup_stats(lat, lon, month, day):
+    """Precomputed statistics for a location and calendar day, or None"""
+    store = get_store()
+    if store is None:
+        return None
+    stats = store.day_stats(lat, lon, month, day)
+    _count(stats is not None)
+    return stats
+
+
+def stats():
+    store = get_store()
+    with _lock:
+        snapshot = dict(_stats)
+    snapshot['available'] = store is not None
+    if store is not None:
+        snapshot.update({key: store.meta[key] for key in ('lat_min', 'lon_min', 'n_lat', 'n_lon', 'resolution')})
+        snapshot['years'] = store.years
+        snapshot['built_at'] = store.meta.get('built_at')
+    return snapshot
+
+
+# Offline build
+
+def summarize(years, values, valid, heat_threshold, rain_threshold):
+    """
+    Statistics over the leading (years) axis of a records block
+    values: (years, ..., RECORD_FIELDS); valid: (years, ...) marks years with data
+    Returns (..., STAT_FIELDS)
+    """
+    temperature, precipitation = values[..., 0], values[..., 1]
+    rained = (values[..., 4] > 0.5) & valid
+    count = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = [count, rained.sum(axis=0) / count * 100]
+        for activity in ACTIVITIES:
+            favorable = analysis_engine.favorable_mask(precipitation, rained, activity) & valid
+            out.append(favorable.sum(axis=0) / count * 100)
+        out.append(((temperature > heat_threshold) & valid).sum(axis=0))
+        out.append(((precipitation > rain_threshold) & valid).sum(axis=0))
+        slopes = analysis_engine.masked_linear_slopes(
+            years, np.stack([temperature, precipitation], axis=-1), valid[..., np.newaxis]
+        )
+    return np.stack(out + [slopes[..., 0], slopes[..., 1]], axis=-1)
+
+
+def compute_stats(records, lats, years, extreme_thresholds):
+    """Statistics for every grid point and day; extreme_thresholds(lat) -> (heat, extreme rain, heatwave)"""
+    n_lat, n_lon, days = records.shape[:3]
+    stats = np.empty((n_lat, n_lon, days, len(STAT_FIELDS)), dtype=np.float32)
+    for row, lat in enumerate(lats):
+        # Years first, as analysis_engine reduces over the leading axis
+        block = np.moveaxis(np.asarray(records[row], dtype=float), 2, 0)  # years x lon x days x fields
+        heat_threshold, rain_threshold, _ = extreme_thresholds(lat)
+        stats[row] = summarize(years, block, ~np.isnan(block[..., 0]), heat_threshold, rain_threshold)
+    return stats
+
+
+def open_work_file(out_dir, shape, resume=False):
+    """Memory-mapped records array in the staging directory next to out_dir"""
+    tmp_dir = f'{out_dir}.next'
+    os.makedirs(tmp_dir, exist_ok=True)
+    path = os.path.join(tmp_dir, 'records.npy')
+    if resume and os.path.exists(path):
+        records = np.lib.format.open_memmap(path, mode='r+')
+        if records.shape != shape:
+            raise ValueError(f'Work file has shape {records.shape}, expected {shape}; rebuild without --resume')
+        return records
+    records = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+    records[:] = np.nan
+    return records
+
+
+def publish(out_dir, records, meta, extreme_thresholds):
+    """Add stats and meta to the staging directory and swap it in, so workers never see half a build"""
+    tmp_dir = f'{out_dir}.next'
+    records.flush()
+    lats = [meta['lat_min'] + i * meta['resolution'] for i in range(meta['n_lat'])]
+    np.save(os.path.join(tmp_dir, 'stats.npy'), compute_stats(records, lats, meta['years'], extreme_thresholds))
+    meta = {**meta, 'record_fields': RECORD_FIELDS, 'stat_fields': STAT_FIELDS,
+            'built_at': datetime.utcnow().isoformat()}
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    # Running workers keep their open mappings of the old files until they restart
+    if os.path.exists(out_dir):
+        old_dir = f'{out_dir}.old'
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(out_dir, old_dir)
+        os.rename(tmp_dir, out_dir)
+        shutil.rmtree(old_dir)
+    else:
+        os.rename(tmp_dir, out_dir)
+
+
+def fill_point(records, row, col, lat, lon, year_slots, fetch_range):
+    """Fetch the years in year_slots ({year: index}) for one grid point; returns True if any data came back"""
+    by_day = fetch_range(lat, lon, datetime(2020, 1, 1), DAYS_PER_YEAR, sorted(year_slots))
+    filled = False
+    for (month, day), day_records in by_day.items():
+        slot = day_of_year(month, day)
+        for record in day_records:
+            index = year_slots.get(record['year'])
+            if index is None:
+                continue  # Only the requested years are stored
+            records[row, col, slot, index] = [float(record[field]) for field in RECORD_FIELDS]
+            filled = True
+    return filled
+
+
+def grid_points(meta):
+    for row in range(meta['n_lat']):
+        for col in range(meta['n_lon']):
+            yield row, col, round(meta['lat_min'] + row * meta['resolution'], 6), \
+                round(meta['lon_min'] + col * meta['resolution'], 6)
+
+
+def build(bounds, resolution, years, out_dir, fetch_range, extreme_thresholds, resume=False):
+    """
+    Fetch the region point by point and publish the store; returns (points, points without data)
+    Progress lives in the memory-mapped work file, so resume skips points already filled
+    """
+    lat_min, lat_max, lon_min, lon_max = bounds
+    years = sorted(years)
+    meta = {
+        'lat_min': lat_min, 'lon_min': lon_min,
+        'n_lat': int(round((lat_max - lat_min) / resolution)) + 1,
+        'n_lon': int(round((lon_max - lon_min) / resolution)) + 1,
+        'resolution': resolution, 'years': years
+    }
+    records = open_work_file(
+        out_dir, (meta['n_lat'], meta['n_lon'], DAYS_PER_YEAR, len(years), len(RECORD_FIELDS)), resume
+    )
+
+    year_slots = {y: i for i, y in enumerate(years)}
+    unfilled = 0
+    for row, col, lat, lon in grid_points(meta):
+        if not np.isnan(records[row, col, :, :, 0]).all():
+            continue
+        if not fill_point(records, row, col, lat, lon, year_slots, fetch_range):
+            unfilled += 1
+        if col == meta['n_lon'] - 1:
+            records.flush()
+            logger.info("Climatology store row done", extra={'row': row + 1, 'rows': meta['n_lat']})
+
+    publish(out_dir, records, meta, extreme_thresholds)
+    return meta['n_lat'] * meta['n_lon'], unfilled
+
+
+def add_year(year, out_dir, fetch_range, extreme_thresholds, keep=None):
+    """Fetch one new year for every grid point, append it and recompute the stats without refetching the rest"""
+    current = ClimatologyStore(out_dir)
+    meta = current.meta
+    years = sorted(set(current.years) | {year})
+    if keep:
+        years = years[-keep:]
+
+    records = open_work_file(
+        out_dir, (meta['n_lat'], meta['n_lon'], DAYS_PER_YEAR, len(years), len(RECORD_FIELDS))
+    )
+    old_slots = {y: i for i, y in enumerate(current.years)}
+    for index, y in enumerate(years):
+        if y in old_slots and y != year:
+            records[:, :, :, index] = current.records[:, :, :, old_slots[y]]
+
+    unfilled = 0
+    new_slot = {year: years.index(year)} if year in years else {}
+    for row, col, lat, lon in grid_points(meta):
+        if new_slot and not fill_point(records, row, col, lat, lon, new_slot, fetch_range):
+            unfilled += 1
+
+    publish(out_dir, records, {**meta, 'years': years}, extreme_thresholds)
+    return meta['n_lat'] * meta['n_lon'], unfilled
+
+
+def parse_years(text):
+    if '-' in text:
+        first, last = (int(part) for part in text.split('-'))
+        return list(range(first, last + 1))
+    return [int(part) for part in text.split(',')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or update the precomputed climatology store')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='Fetch and precompute a region')
+    build_parser.add_argument('--bounds', required=True, help='lat_min,lat_max,lon_min,lon_max')
+    build_parser.add_argument('--resolution', type=float, default=0.25, help='Grid spacing in degrees')
+    build_parser.add_argument('--years', default='2014-2023', help='Range (2014-2023) or comma list')
+    build_parser.add_argument('--resume', action='store_true', help='Keep points filled by an interrupted build')
+
+    add_parser = commands.add_parser('add-year', help='Append one new year and recompute the stats')
+    add_parser.add_argument('year', type=int)
+    add_parser.add_argument('--keep', type=int, help='Keep only the most recent N years')
+
+    commands.add_parser('info', help='Describe the current store')
+
+    for sub in (build_parser, add_parser):
+        sub.add_argument('--out', default=CLIMATOLOGY_STORE_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(stats(), indent=2))
+    else:
+        # app is only needed for the upstream fetch, so it is imported here
+        import rate_limiter
+        from app import extreme_thresholds, fetch_meteomatics_range
+
+        # Offline builds leave upstream quota to interactive traffic
+        with rate_limiter.priority(rate_limiter.BACKGROUND):
+            if args.command == 'build':
+                bounds = [float(value) for value in args.bounds.split(',')]
+                points, unfilled = build(bounds, args.resolution, parse_years(args.years), args.out,
+                                         fetch_meteomatics_range, extreme_thresholds, resume=args.resume)
+            else:
+                points, unfilled = add_year(args.year, args.out, fetch_meteomatics_range,
+                                            extreme_thresholds, keep=args.keep)
+        print(f'🗄️ Climatology store written to {args.out}: {points} grid points, {unfilled} without data')
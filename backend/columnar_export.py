@@ -0,0 +1,144 @@
+"""
+Columnar bulk export (Parquet / Arrow IPC)
+Writes one typed table per section - forecast days, historical years and
+extreme-event counts - so analysts can load results straight into pandas.
+Several analyses can go into one export; every row carries its location.
+"""
+import importlib.util
+import zipfile
+from datetime import date
+from io import BytesIO
+
+# pyarrow is optional and slow to import, so it is loaded on first export
+pa = None
+ipc = None
+pq = None
+
+COLUMNAR_FORMATS = ['parquet', 'arrow']
+COLUMNAR_COMPRESSION = 'zstd'
+
+EXTREME_EVENT_TYPES = ['extreme_heat', 'extreme_rainfall', 'heat_wave', 'dangerous_winds']
+
+
+def available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _load_pyarrow():
+    global pa, ipc, pq
+    if pa is None:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+        ipc = pyarrow.ipc
+        pq = pyarrow.parquet
+        pa = pyarrow
+
+
+def _location_schema():
+    return [
+        ('analysis_id', pa.string()),
+        ('location_name', pa.string()),
+        ('lat', pa.float64()),
+        ('lon', pa.float64()),
+        ('activity_type', pa.string())
+    ]
+
+
+def _schemas():
+    location = _location_schema()
+    return {
+        'forecast_days': pa.schema(location + [
+            ('date', pa.date32()),
+            ('temperature_c', pa.float64()),
+            ('precipitation_mm', pa.float64()),
+            ('precipitation_probability', pa.float64()),
+            ('humidity_percent', pa.float64()),
+            ('wind_speed_ms', pa.float64()),
+            ('soil_moisture_index', pa.float64()),
+            ('conditions', pa.string())
+        ]),
+        'historical_years': pa.schema(location + [
+            ('year', pa.int32()),
+            ('date', pa.date32()),
+            ('temperature_c', pa.float64()),
+            ('precipitation_mm', pa.float64()),
+            ('humidity_percent', pa.float64()),
+            ('wind_speed_ms', pa.float64()),
+            ('rained', pa.bool_()),
+            ('was_favorable', pa.bool_())
+        ]),
+        'extreme_events': pa.schema(location + [
+            ('event_type', pa.string()),
+            ('probability', pa.float64()),
+            ('occurrences', pa.int32()),
+            ('severity', pa.string()),
+            ('threshold', pa.string())
+        ])
+    }
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_tables(analyses):
+    """
+    One typed pyarrow table per section for a list of (analysis_id, analysis) pairs
+    Returns {section_name: pyarrow.Table}
+    """
+    _load_pyarrow()
+    rows = {'forecast_days': [], 'historical_years': [], 'extreme_events': []}
+
+    for analysis_id, analysis in analyses:
+        location = analysis.get('location', {})
+        base = {
+            'analysis_id': analysis_id,
+            'location_name': location.get('name'),
+            'lat': location.get('lat'),
+            'lon': location.get('lon'),
+            'activity_type': location.get('activity_type')
+        }
+
+        if 'historical_data' not in analysis:
+            for day in analysis.get('forecast', []):
+                rows['forecast_days'].append({**base, **day, 'date': _parse_date(day.get('date'))})
+
+        for year in analysis.get('historical_data', []):
+            rows['historical_years'].append({**base, **year, 'date': _parse_date(year.get('date'))})
+
+        extreme_events = analysis.get('extreme_events') or {}
+        for event_type in EXTREME_EVENT_TYPES:
+            event = extreme_events.get(event_type)
+            if event:
+                rows['extreme_events'].append({**base, 'event_type': event_type, **event})
+
+    schemas = _schemas()
+    return {
+        name: pa.Table.from_pylist(section_rows, schema=schemas[name])
+        for name, section_rows in rows.items()
+    }
+
+
+def write_archive(tables, format_type):
+    """Zip archive holding one compressed Parquet or Arrow IPC file per table"""
+    _load_pyarrow()
+    extension = 'parquet' if format_type == 'parquet' else 'arrow'
+    archive = BytesIO()
+
+    # Table files are already compressed, so the zip only stores them
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for name, table in tables.items():
+            sink = BytesIO()
+            if format_type == 'parquet':
+                pq.write_table(table, sink, compression=COLUMNAR_COMPRESSION)
+            else:
+                options = ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION)
+                with ipc.new_file(sink, table.schema, options=options) as writer:
+                    writer.write_table(table)
+            zf.writestr(f'{name}.{extension}', sink.getvalue())
+
+    return archive.getvalue()
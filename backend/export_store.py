@@ -0,0 +1,102 @@
+"""
+Server-side store of computed analyses for download by ID
+Each analysis is kept under a short content-hash ID for EXPORT_TTL_SECONDS so
+clients can request exports without uploading the analysis again.
+Backed by SQLite so every worker on the host sees the same entries.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EXPORT_STORE_PATH = os.getenv(
+    "EXPORT_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "export_store.sqlite3")
+)
+EXPORT_TTL_SECONDS = float(os.getenv("EXPORT_TTL_SECONDS", 3600))
+EXPORT_ID_LENGTH = 16
+
+# IDs this worker stored recently, so repeat responses skip the write
+_recent = {}
+_recent_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(EXPORT_STORE_PATH, timeout=5)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS exports ("
+            " id TEXT PRIMARY KEY,"
+            " analysis TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def analysis_id(analysis):
+    """Short content hash identifying an analysis"""
+    canonical = json.dumps(analysis, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:EXPORT_ID_LENGTH]
+
+
+def put(analysis, export_id=None):
+    """Store an analysis and return its ID; pass a precomputed analysis_id() to skip hashing"""
+    export_id = export_id or analysis_id(analysis)
+    now = time.time()
+
+    with _recent_lock:
+        if _recent.get(export_id, 0) > now + EXPORT_TTL_SECONDS / 2:
+            return export_id
+
+    try:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO exports (id, analysis, expires_at) VALUES (?, ?, ?)",
+                (export_id, json.dumps(analysis, default=str), now + EXPORT_TTL_SECONDS)
+            )
+            conn.execute("DELETE FROM exports WHERE expires_at < ?", (now,))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Export store write failed: %s", e)
+        return None
+
+    with _recent_lock:
+        _recent[export_id] = now + EXPORT_TTL_SECONDS
+        for stale in [k for k, expires in _recent.items() if expires < now]:
+            del _recent[stale]
+
+    return export_id
+
+
+def get(export_id):
+    """
+    Return (analysis, seconds_left) for a stored ID, or (None, 0) if unknown or expired
+    """
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                "SELECT analysis, expires_at FROM exports WHERE id = ?", (export_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Export store read failed: %s", e)
+        return None, 0
+
+    if row is None or row[1] < time.time():
+        return None, 0
+    return json.loads(row[0]), int(row[1] - time.time())
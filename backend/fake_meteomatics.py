@@ -0,0 +1,155 @@
+"""
+Offline stand-in for the Meteomatics API
+Answers the same time-series URLs the backend builds
+(/<times>/<params>/<lat>,<lon>/json, times as a comma list or
+'start--end:P1D' ranges) with deterministic values per location and date,
+so benchmarks and local runs need no credentials. Latency and failures can
+be injected to exercise deadlines, fallbacks and the circuit breaker.
+
+Usage:
+    python fake_meteomatics.py --port 8765 --latency-ms 150 --jitter-ms 50 --error-rate 0.05
+    METEOMATICS_BASE_URL=http://127.0.0.1:8765 gunicorn app:app
+"""
+import argparse
+import json
+import random
+import re
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# (low, high) value range per parameter; precipitation is zero on dry days
+PARAMETER_RANGES = {
+    't_2m:C': (12.0, 38.0),
+    'precip_24h:mm': (0.5, 45.0),
+    'relative_humidity_2m:p': (25.0, 95.0),
+    'wind_speed_10m:ms': (0.5, 16.0)
+}
+DRY_DAY_PROBABILITY = 0.6
+
+STEP_PATTERN = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?)?$')
+
+
+def expand_times(spec):
+    """Comma-separated timestamps and 'start--end:step' ranges -> list of ISO timestamps"""
+    times = []
+    for part in spec.split(','):
+        if '--' not in part:
+            times.append(part)
+            continue
+        span, _, step = part.partition(':P')
+        first, last = (datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ') for value in span.split('--'))
+        match = STEP_PATTERN.match('P' + step)
+        if not match:
+            raise ValueError(f'Unsupported step: P{step}')
+        delta = timedelta(days=int(match.group(1) or 0), hours=int(match.group(2) or 0))
+        if delta <= timedelta(0):
+            raise ValueError(f'Unsupported step: P{step}')
+        current = first
+        while current <= last:
+            times.append(current.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            current += delta
+    return times
+
+
+def fake_value(parameter, lat, lon, timestamp):
+    """Stable pseudo-random value for one parameter, location and date"""
+    seed = zlib.crc32(f'{parameter}|{lat}|{lon}|{timestamp[:10]}'.encode())
+    rng = random.Random(seed)
+    if parameter.startswith('precip'):
+        # Dry days are shared by all precipitation parameters of a date
+        dry_rng = random.Random(zlib.crc32(f'dry|{lat}|{lon}|{timestamp[:10]}'.encode()))
+        if dry_rng.random() < DRY_DAY_PROBABILITY:
+            return 0.0
+    low, high = PARAMETER_RANGES.get(parameter, (0.0, 100.0))
+    return round(rng.uniform(low, high), 1)
+
+
+def build_response(times, parameters, lat, lon):
+    return {
+        'version': '3.0',
+        'user': 'fake',
+        'status': 'OK',
+        'data': [
+            {
+                'parameter': parameter,
+                'coordinates': [{
+                    'lat': lat,
+                    'lon': lon,
+                    'dates': [{'date': ts, 'value': fake_value(parameter, lat, lon, ts)} for ts in times]
+                }]
+            }
+            for parameter in parameters
+        ]
+    }
+
+
+class FakeMeteomaticsHandler(BaseHTTPRequestHandler):
+    # Set from the command line in main()
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    error_rate = 0.0
+    hang_rate = 0.0
+    hang_seconds = 30.0
+    quiet = True
+
+    def do_GET(self):
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        roll = random.random()
+        if roll < self.hang_rate:
+            # Longer than any sensible client deadline
+            time.sleep(self.hang_seconds)
+        time.sleep(delay)
+
+        if roll < self.hang_rate + self.error_rate:
+            return self._send(503, {'status': 'error', 'message': 'injected failure'})
+
+        try:
+            times_spec, parameters, location, _ = self.path.split('?')[0].strip('/').split('/')
+            lat, lon = (float(value) for value in location.split(','))
+            payload = build_response(expand_times(times_spec), parameters.split(','), lat, lon)
+        except ValueError as e:
+            return self._send(400, {'status': 'error', 'message': f'bad request: {str(e)}'})
+        self._send(200, payload)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host, port):
+    server = ThreadingHTTPServer((host, port), FakeMeteomaticsHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline Meteomatics stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean added latency per call')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform +/- jitter around the mean')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls answered with 503')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='Share of calls that stall past client deadlines')
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    FakeMeteomaticsHandler.latency_ms = args.latency_ms
+    FakeMeteomaticsHandler.jitter_ms = args.jitter_ms
+    FakeMeteomaticsHandler.error_rate = args.error_rate
+    FakeMeteomaticsHandler.hang_rate = args.hang_rate
+    FakeMeteomaticsHandler.hang_seconds = args.hang_seconds
+    FakeMeteomaticsHandler.quiet = not args.verbose
+
+    print(f'🧪 Fake Meteomatics listening on http://{args.host}:{args.port}')
+    serve(args.host, args.port).serve_forever()
@@ -0,0 +1,257 @@
+"""
+Place-name gazetteer with a memory-mapped spatial index
+An offline build turns a GeoNames extract into a directory of flat arrays:
+points as unit vectors laid out as an implicit k-d tree, plus a UTF-8 name
+blob. Workers open those files with mmap, so every gunicorn worker on the
+host shares one copy through the page cache. Nearest-place lookups walk the
+tree in O(log n); distances are great-circle (the chord on the unit sphere
+is the haversine term). Results are memoized per snapped coordinate.
+
+Build (GeoNames dumps from https://download.geonames.org/export/dump/):
+    python gazetteer.py IN.txt --admin1 admin1CodesASCII.txt --countries countryInfo.txt
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import sys
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer")
+)
+GAZETTEER_MAX_DISTANCE_KM = float(os.getenv("GAZETTEER_MAX_DISTANCE_KM", 50))
+GAZETTEER_SNAP_DEGREES = float(os.getenv("GAZETTEER_SNAP_DEGREES", 0.01))  # ~1 km
+GAZETTEER_CACHE_SIZE = int(os.getenv("GAZETTEER_CACHE_SIZE", 100000))
+
+EARTH_RADIUS_KM = 6371.0088
+
+_index = None
+_missing = False
+_lock = threading.Lock()
+
+
+def to_unit_vectors(lats, lons):
+    lat_rad, lon_rad = np.radians(lats), np.radians(lons)
+    return np.column_stack((
+        np.cos(lat_rad) * np.cos(lon_rad),
+        np.cos(lat_rad) * np.sin(lon_rad),
+        np.sin(lat_rad)
+    ))
+
+
+def chord_to_km(chord):
+    """Great-circle distance for a unit-sphere chord (2 * asin(c / 2) is haversine's central angle)"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class GazetteerIndex:
+    """Read-only view over a built gazetteer directory"""
+
+    def __init__(self, path):
+        self.points = np.load(os.path.join(path, 'points.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(path, 'name_offsets.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'names.bin'), 'rb') as f:
+            self.names = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self.points)
+        if self.size == 0:
+            raise ValueError('gazetteer index is empty')
+        # Flat float view over the same mapped pages; element access is far cheaper than numpy indexing
+        self._coords = memoryview(np.asarray(self.points).reshape(-1))
+
+    def name(self, index):
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self.names[start:end].decode('utf-8')
+
+    def nearest(self, lat, lon):
+        """(index, distance_km) of the closest place"""
+        lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+        target = (math.cos(lat_rad) * math.cos(lon_rad), math.cos(lat_rad) * math.sin(lon_rad), math.sin(lat_rad))
+        coords = self._coords
+        best_index, best_sq = -1, math.inf
+
+        # Implicit k-d tree: the median of [lo, hi) sits at (lo + hi) // 2, split axis = depth % 3
+        stack = [(0, self.size, 0, 0.0)]
+        while stack:
+            lo, hi, depth, bound_sq = stack.pop()
+            if lo >= hi or bound_sq >= best_sq:
+                continue
+            mid = (lo + hi) // 2
+            point = coords[3 * mid:3 * mid + 3].tolist()
+            dist_sq = ((point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+                       + (point[2] - target[2]) ** 2)
+            if dist_sq < best_sq:
+                best_index, best_sq = mid, dist_sq
+
+            axis = depth % 3
+            diff = target[axis] - point[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            # Far side only matters if the splitting plane is closer than the best so far
+            stack.append((far[0], far[1], depth + 1, diff * diff))
+            stack.append((near[0], near[1], depth + 1, 0.0))
+
+        return best_index, chord_to_km(math.sqrt(best_sq))
+
+
+def get_index():
+    """Open the gazetteer on first use; None when no gazetteer has been built"""
+    global _index, _missing
+    if _index is None and not _missing:
+        with _lock:
+            if _index is None and not _missing:
+                if os.path.exists(os.path.join(GAZETTEER_PATH, 'points.npy')):
+                    try:
+                        _index = GazetteerIndex(GAZETTEER_PATH)
+                    except (OSError, ValueError) as e:
+                        # A damaged index must not break the requests that only want a place name
+                        logger.warning("Gazetteer at %s is unusable, answering without it: %s", GAZETTEER_PATH, e)
+                        _missing = True
+                else:
+                    _missing = True
+    return _index
+
+
+def available():
+    return get_index() is not None
+
+
+def snap(value):
+    return round(round(value / GAZETTEER_SNAP_DEGREES) * GAZETTEER_SNAP_DEGREES, 6)
+
+
+def nearest_name(lat, lon):
+    """Name of the closest place within GAZETTEER_MAX_DISTANCE_KM, or None"""
+    return _nearest_name_snapped(snap(lat), snap(lon))
+
+
+@lru_cache(maxsize=GAZETTEER_CACHE_SIZE)
+def _nearest_name_snapped(lat, lon):
+    index = get_index()
+    if index is None or index.size == 0:
+        return None
+    place, distance_km = index.nearest(lat, lon)
+    return index.name(place) if distance_km <= GAZETTEER_MAX_DISTANCE_KM else None
+
+
+def cache_stats():
+    info = _nearest_name_snapped.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'entries': info.currsize, 'max_entries': info.maxsize}
+
+
+# Offline build
+
+def read_lookup(path, key_column, value_column):
+    """Tab-separated GeoNames side table (admin1 codes, country info) as a dict"""
+    lookup = {}
+    if not path:
+        return lookup
+    with open(path, encoding='utf-8') as f:
+        for row in csv.reader(f, delimiter='\t'):
+            if row and not row[0].startswith('#') and len(row) > max(key_column, value_column):
+                lookup[row[key_column]] = row[value_column]
+    return lookup
+
+
+def read_places(path, admin1_names, country_names, feature_classes, min_population):
+    """Yield (lat, lon, display name) from a GeoNames main-table dump"""
+    csv.field_size_limit(sys.maxsize)
+    with open(path, encoding='utf-8') as f:
+        for row in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+            if len(row) < 15 or row[6] not in feature_classes:
+                continue
+            try:
+                lat, lon = float(row[4]), float(row[5])
+                population = int(row[14] or 0)
+            except ValueError:
+                continue
+            if population < min_population:
+                continue
+            country = row[8]
+            parts = [row[1], admin1_names.get(f'{country}.{row[10]}'), country_names.get(country, country)]
+            yield lat, lon, ', '.join(part for part in parts if part)
+
+
+def kd_order(points):
+    """Permutation that lays points out as an implicit k-d tree (median of each range in the middle)"""
+    order = np.arange(len(points))
+    stack = [(0, len(points), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= 1:
+            continue
+        mid = (lo + hi) // 2
+        segment = order[lo:hi]
+        partition = np.argpartition(points[segment, depth % 3], mid - lo)
+        order[lo:hi] = segment[partition]
+        stack.append((lo, mid, depth + 1))
+        stack.append((mid + 1, hi, depth + 1))
+    return order
+
+
+def build(places, out_dir):
+    """Write the index files for a list of (lat, lon, name); returns the place count"""
+    if not places:
+        # Readers cannot open an empty index, so never replace a working one with it
+        raise ValueError('No places to index')
+    lats = np.array([place[0] for place in places], dtype=np.float64)
+    lons = np.array([place[1] for place in places], dtype=np.float64)
+    points = to_unit_vectors(lats, lons)
+    order = kd_order(points)
+
+    encoded = [places[i][2].encode('utf-8') for i in order]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(name) for name in encoded])
+
+    # Write to a temporary directory and swap it in, so running workers never see half a build
+    tmp_dir = f'{out_dir}.tmp'
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, 'points.npy'), np.ascontiguousarray(points[order]))
+    np.save(os.path.join(tmp_dir, 'name_offsets.npy'), offsets)
+    with open(os.path.join(tmp_dir, 'names.bin'), 'wb') as f:
+        f.write(b''.join(encoded))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'places': len(encoded), 'format': 'implicit-kdtree-v1'}, f)
+
+    if os.path.exists(out_dir):
+        old_dir = f'{out_dir}.old'
+        # Left behind by an interrupted build; it would make the rename fail
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(out_dir, old_dir)
+        os.rename(tmp_dir, out_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    else:
+        os.rename(tmp_dir, out_dir)
+    return len(encoded)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the gazetteer index from a GeoNames dump')
+    parser.add_argument('geonames', help='GeoNames main table (e.g. IN.txt, cities500.txt)')
+    parser.add_argument('--admin1', help='admin1CodesASCII.txt, to add state/province names')
+    parser.add_argument('--countries', help='countryInfo.txt, to spell out country names')
+    parser.add_argument('--feature-classes', default='P', help='GeoNames feature classes to keep (P = populated places)')
+    parser.add_argument('--min-population', type=int, default=0)
+    parser.add_argument('--out', default=GAZETTEER_PATH)
+    args = parser.parse_args()
+
+    places = list(read_places(
+        args.geonames,
+        read_lookup(args.admin1, 0, 1),
+        read_lookup(args.countries, 0, 4),
+        set(args.feature_classes),
+        args.min_population
+    ))
+    if not places:
+        sys.exit(f'No places in {args.geonames} matched the filters; the existing index was left in place')
+    count = build(places, args.out)
+    print(f'🗺️ Indexed {count} places into {args.out}')
@@ -0,0 +1,235 @@
+"""
+Load test and benchmark harness for the WeatherWise API
+Drives /api/forecast, /api/historical-analysis and /api/download at fixed
+concurrency levels and reports p50/p95/p99 latency and requests per second.
+Each run is appended (with the current git commit) to a JSON-lines results
+file, and --compare checks it against the latest run of another commit.
+
+Usage (against the offline stand-in, no credentials needed):
+    python fake_meteomatics.py --latency-ms 150 &
+    METEOMATICS_BASE_URL=http://127.0.0.1:8765 gunicorn -w 4 -b 127.0.0.1:5000 app:app &
+    python load_test.py --concurrency 1,8,32 --requests 200 --compare
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+LOAD_TEST_RESULTS_PATH = os.getenv(
+    "LOAD_TEST_RESULTS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results", "load_test.jsonl")
+)
+
+SCENARIOS = ['forecast', 'historical', 'download']
+ACTIVITIES = ['harvest', 'planting', 'spraying', 'event']
+
+# Service region used to spread requests over distinct locations (lat/lon bounds)
+REGION = ((8.0, 30.0), (68.0, 90.0))
+
+_local = threading.local()
+
+
+def session():
+    """One keep-alive session per load-generator thread"""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def location_pool(distinct, seed):
+    rng = random.Random(seed)
+    (lat_min, lat_max), (lon_min, lon_max) = REGION
+    return [
+        (round(rng.uniform(lat_min, lat_max), 3), round(rng.uniform(lon_min, lon_max), 3))
+        for _ in range(distinct)
+    ]
+
+
+def build_requests(scenario, base_url, count, locations, seed):
+    """Deterministic list of (method, url, json_body) for one scenario"""
+    rng = random.Random(f'{scenario}{seed}')
+    planned = []
+
+    download_body = None
+    if scenario == 'download':
+        # One real analysis to export, fetched up front so only the download is timed
+        lat, lon = locations[0]
+        analysis = session().get(f'{base_url}/api/forecast', params={'lat': lat, 'lon': lon}, timeout=30).json()
+        download_body = {'format': 'csv', 'data': analysis}
+
+    for _ in range(count):
+        lat, lon = rng.choice(locations)
+        activity = rng.choice(ACTIVITIES)
+        if scenario == 'forecast':
+            planned.append(('GET', f'{base_url}/api/forecast?lat={lat}&lon={lon}&activity={activity}', None))
+        elif scenario == 'historical':
+            target = datetime.now() + timedelta(days=rng.randint(30, 365))
+            planned.append(('GET', f'{base_url}/api/historical-analysis?lat={lat}&lon={lon}'
+                                   f'&date={target:%Y-%m-%d}&activity={activity}', None))
+        else:
+            planned.append(('POST', f'{base_url}/api/download', download_body))
+    return planned
+
+
+def timed_call(method, url, body, timeout):
+    started = time.perf_counter()
+    try:
+        response = session().request(method, url, json=body, timeout=timeout)
+        response.content  # Include body transfer in the timing
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run_level(planned, concurrency, timeout):
+    """Fire the planned requests with a fixed number of concurrent clients"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(lambda call: timed_call(*call, timeout), planned))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, ok in outcomes if ok)
+    errors = sum(1 for _, ok in outcomes if not ok)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(planned),
+        'errors': errors,
+        'rps': round(len(planned) / wall, 2) if wall else None,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def load_runs(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_run(path, run):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+
+def compare(run, baseline, threshold_pct):
+    """Print p95/rps deltas against a baseline run; returns the regressed (scenario, concurrency) pairs"""
+    previous = {(r['scenario'], r['concurrency']): r for r in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} ({baseline['timestamp']}):")
+    for result in run['results']:
+        key = (result['scenario'], result['concurrency'])
+        before = previous.get(key)
+        if not before or not before['p95_ms'] or not result['p95_ms']:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+        flag = ''
+        if change > threshold_pct:
+            regressions.append(key)
+            flag = '  <-- regression'
+        print(f"  {key[0]:<11} c={key[1]:<4} p95 {before['p95_ms']:>9.2f} -> {result['p95_ms']:>9.2f} ms "
+              f"({change:+.1f}%)  rps {before['rps']} -> {result['rps']}{flag}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'scenario':<11} {'conc':>5} {'reqs':>6} {'errors':>6} {'rps':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for r in results:
+        print(f"{r['scenario']:<11} {r['concurrency']:>5} {r['requests']:>6} {r['errors']:>6} "
+              f"{r['rps'] or 0:>9.2f} {r['p50_ms'] or 0:>9.2f} {r['p95_ms'] or 0:>9.2f} {r['p99_ms'] or 0:>9.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the WeatherWise API')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma list of ' + ', '.join(SCENARIOS))
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma list of concurrency levels')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and level')
+    parser.add_argument('--distinct-locations', type=int, default=50, help='Size of the location pool (cache pressure)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--label', default='', help='Free-form note stored with the run')
+    parser.add_argument('--results', default=LOAD_TEST_RESULTS_PATH)
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='Compare with the latest run of another commit')
+    parser.add_argument('--baseline', help='Commit to compare with (default: latest other commit)')
+    parser.add_argument('--threshold-pct', type=float, default=20.0, help='p95 increase that counts as a regression')
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    levels = [int(level) for level in args.concurrency.split(',')]
+    locations = location_pool(args.distinct_locations, args.seed)
+
+    results = []
+    for scenario in scenarios:
+        for concurrency in levels:
+            # A fresh (but reproducible) mix per level, so later levels do not just replay cached keys
+            planned = build_requests(scenario, args.base_url, args.requests, locations, f'{args.seed}-{concurrency}')
+            result = run_level(planned, concurrency, args.timeout)
+            results.append({'scenario': scenario, **result})
+
+    run = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'label': args.label,
+        'base_url': args.base_url,
+        'requests_per_level': args.requests,
+        'distinct_locations': args.distinct_locations,
+        'seed': args.seed,
+        'results': results
+    }
+    print_table(results)
+
+    regressions = []
+    if args.compare:
+        runs = load_runs(args.results)
+        candidates = [r for r in runs if (r['commit'] == args.baseline if args.baseline else r['commit'] != run['commit'])]
+        if candidates:
+            regressions = compare(run, candidates[-1], args.threshold_pct)
+        else:
+            print('\nNo baseline run to compare with')
+
+    if not args.no_save:
+        save_run(args.results, run)
+        print(f'\n💾 Saved run to {args.results}')
+
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,124 @@
+"""
+Structured, non-blocking logging
+Request threads only put records on an in-memory queue; a listener thread
+formats them (one JSON object per line by default) and writes to stdout.
+Every record carries the request ID of the request that produced it, and
+DEBUG records are sampled per request so a sampled request keeps all of its
+debug lines while the rest drop theirs.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # 'json' or 'text'
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.1))
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_listener = None
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def bind_request_id(request_id=None):
+    """Set the ID carried by log records of the current request; returns it"""
+    request_id = request_id or uuid.uuid4().hex
+    _request_id.set(request_id)
+    return request_id
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps the request ID and drops DEBUG records outside the sample"""
+
+    def filter(self, record):
+        request_id = _request_id.get()
+        record.request_id = request_id
+        if record.levelno > logging.DEBUG or LOG_DEBUG_SAMPLE_RATE >= 1:
+            return True
+        if request_id is None:
+            return random.random() < LOG_DEBUG_SAMPLE_RATE
+        # Same decision for every record of one request
+        return zlib.crc32(request_id.encode()) % 10000 < LOG_DEBUG_SAMPLE_RATE * 10000
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves formatting to the listener thread"""
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'pid': record.process
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def _build_output_handler():
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+        ))
+    return handler
+
+
+def _start_listener(log_queue):
+    global _listener
+    _listener = QueueListener(log_queue, _build_output_handler(), respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure():
+    """Route all logging through the queue (safe to call more than once)"""
+    root = logging.getLogger()
+    if any(isinstance(handler, DeferredQueueHandler) for handler in root.handlers):
+        return
+
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    _start_listener(log_queue)
+    atexit.register(_stop_listener)
+    # The listener thread does not survive fork (gunicorn --preload), so restart it in each worker
+    os.register_at_fork(after_in_child=lambda: _start_listener(log_queue))
@@ -0,0 +1,142 @@
+"""
+Shared Meteomatics upstream client
+Holds one pooled requests.Session per worker process and a bounded thread pool
+so several upstream calls can run in parallel under one overall deadline.
+All calls go through the shared rate limiter and circuit breaker.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import metrics
+import rate_limiter
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Connection pool and concurrency settings (per worker process)
+METEOMATICS_POOL_SIZE = int(os.getenv("METEOMATICS_POOL_SIZE", 10))
+METEOMATICS_MAX_WORKERS = int(os.getenv("METEOMATICS_MAX_WORKERS", 4))
+METEOMATICS_DEADLINE_SECONDS = float(os.getenv("METEOMATICS_DEADLINE_SECONDS", 10))
+
+# Shared by the sync and async clients of this worker
+breaker = CircuitBreaker('meteomatics')
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """Return the worker's shared keep-alive session, creating it on first use"""
+    global _session
+    if _session is None:
+        # requests is imported here rather than at module level to keep it off the boot path
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=METEOMATICS_POOL_SIZE,
+                    pool_maxsize=METEOMATICS_POOL_SIZE
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def get_executor():
+    """Return the worker's bounded thread pool for upstream calls"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=METEOMATICS_MAX_WORKERS,
+                    thread_name_prefix="meteomatics"
+                )
+    return _executor
+
+
+def get(url, auth, timeout=METEOMATICS_DEADLINE_SECONDS):
+    """Single GET through the pooled session, refused while the circuit is open"""
+    # Breaker first, so refused calls do not spend shared quota
+    if not breaker.allow_request():
+        metrics.upstream_requests.inc('circuit_open')
+        raise CircuitOpenError('Meteomatics circuit is open')
+    try:
+        rate_limiter.acquire()
+    except rate_limiter.RateLimitedError:
+        breaker.release_request()
+        metrics.upstream_requests.inc('rate_limited')
+        raise
+    started = time.perf_counter()
+    try:
+        response = get_session().get(url, auth=auth, timeout=timeout)
+    except Exception:
+        record_latency('error', started)
+        breaker.record_failure()
+        raise
+    record_latency(str(response.status_code), started)
+    record_response(response)
+    return response
+
+
+def record_latency(status, started):
+    metrics.upstream_requests.inc(status)
+    metrics.upstream_latency.observe(time.perf_counter() - started, status)
+
+
+def record_response(response):
+    """Count 5xx and 429 answers as upstream failures; other 4xx come from bad input, not an unhealthy upstream"""
+    if response.status_code >= 500 or response.status_code == 429:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def fetch_all(urls, auth, deadline=METEOMATICS_DEADLINE_SECONDS):
+    """
+    Fetch several URLs in parallel and stop waiting once the overall deadline passes
+    Returns {url: response} for every call that finished in time; failed or late
+    calls are left out so the caller can work with partial results
+    """
+    if not urls:
+        return {}
+    if breaker.is_open():
+        breaker.record_short_circuit()
+        logger.warning("Meteomatics circuit open - skipping upstream calls")
+        return {}
+
+    started = time.monotonic()
+    executor = get_executor()
+    # Each call runs in the caller's context so its rate-limit priority carries over
+    futures = {
+        executor.submit(contextvars.copy_context().run, get, url, auth, deadline): url
+        for url in urls
+    }
+
+    done, not_done = wait(futures, timeout=deadline)
+    for future in not_done:
+        future.cancel()
+
+    responses = {}
+    for future in done:
+        url = futures[future]
+        try:
+            responses[url] = future.result()
+        except Exception as e:
+            logger.warning("Upstream call failed: %s", e)
+
+    if not_done:
+        elapsed = time.monotonic() - started
+        logger.warning("Deadline of %ss reached after %.1fs - %d of %d upstream calls dropped",
+                       deadline, elapsed, len(not_done), len(urls))
+
+    return responses
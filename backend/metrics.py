@@ -0,0 +1,134 @@
+"""
+In-process metrics in Prometheus text format
+Counters and fixed-bucket histograms are kept per worker process, so each
+gunicorn worker reports its own series; scrape every worker (or sum in the
+query) for host totals. Recording is a lock plus a bisect, cheap enough for
+the request path.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _format_labels(labelnames, labels, extra=None):
+    pairs = list(zip(labelnames, labels))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                label_text = _format_labels(self.labelnames, labels, ('le', bound))
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {round(total, 6)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+def gauge_lines(name, help_text, samples, labelnames=()):
+    """Render a gauge from values read at scrape time; samples is [(labels tuple, value)]"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    for labels, value in samples:
+        lines.append(f'{name}{_format_labels(labelnames, labels)} {value}')
+    return lines
+
+
+def render(extra_lines=()):
+    """Every registered metric plus scrape-time lines, as one exposition document"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics shared across modules
+http_requests = Counter(
+    'weatherwise_http_requests_total', 'HTTP requests handled', ('endpoint', 'method', 'status')
+)
+http_latency = Histogram(
+    'weatherwise_http_request_duration_seconds', 'Time to build the HTTP response', ('endpoint',)
+)
+stage_latency = Histogram(
+    'weatherwise_stage_duration_seconds',
+    'Time spent in each stage of an analysis (fetch, stats, extreme_events, trends, serialization)',
+    ('stage',)
+)
+upstream_requests = Counter(
+    'weatherwise_upstream_requests_total',
+    'Meteomatics calls by outcome (HTTP status, error, circuit_open or rate_limited)',
+    ('status',)
+)
+upstream_latency = Histogram(
+    'weatherwise_upstream_request_duration_seconds', 'Meteomatics call latency', ('status',)
+)
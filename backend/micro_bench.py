@@ -0,0 +1,292 @@
+"""
+Micro-benchmarks for the pure analysis functions
+Times each function over synthetic inputs of growing size, along the
+dimension the function actually walks (days of data, historical years,
+forecasts scored, lookups), and fits how the time grows with the input. A growth exponent above --max-exponent (an accidental O(n^2)
+loop shows up as ~2) fails the run, whatever machine it runs on. Runs are
+appended to a JSON-lines file with the git commit, and --compare also
+checks per-size timings against the latest run of another commit.
+
+Usage:
+    python micro_bench.py                     # table + threshold check
+    python micro_bench.py --json              # machine-readable result on stdout
+    python micro_bench.py --compare --tolerance-pct 50
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Keep the import of app quiet and off the network
+os.environ.setdefault('STARTUP_PROBE', 'off')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+import analysis_engine
+import app
+from load_test import git_commit, load_runs, save_run
+
+MICRO_BENCH_RESULTS_PATH = os.getenv(
+    "MICRO_BENCH_RESULTS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results", "micro_bench.jsonl")
+)
+
+FORECAST_SIZES = [7, 30, 90, 365]
+YEAR_SIZES = [10, 20, 30, 50]
+LOOKUP_SIZES = [10, 100, 1000]
+# The per-forecast scorers only read the first few days, so they scale with the number of forecasts
+FORECAST_COUNTS = [10, 100, 1000]
+GRID_CELLS = 100
+SCAN_WINDOW = 7
+
+# Minimum time per measured round, so tiny functions are not lost in timer noise
+MIN_ROUND_SECONDS = 0.02
+
+
+def synthetic_forecast(num_days, lat=18.5, lon=73.8):
+    start = datetime(2025, 6, 1)
+    days = app.simulate_forecast_days(lat, lon, num_days)
+    for i, day in enumerate(days):
+        day['date'] = (start + timedelta(days=i)).strftime('%Y-%m-%d')
+    return days
+
+
+def synthetic_years(num_years, month=7, day=15, seed=7):
+    rng = random.Random(seed)
+    years = []
+    for year in range(2024 - num_years, 2024):
+        rained = rng.random() < 0.5
+        values = {
+            't_2m:C': rng.uniform(18, 42),
+            'precip_24h:mm': rng.uniform(6, 90) if rained else rng.uniform(0, 4),
+            'relative_humidity_2m:p': rng.uniform(30, 95),
+            'wind_speed_10m:ms': rng.uniform(0.5, 18)
+        }
+        record = app.build_year_record(year, month, day, values)
+        record['was_favorable'] = not record['rained']
+        years.append(record)
+    return years
+
+
+def synthetic_forecasts(count, seed=13):
+    rng = random.Random(seed)
+    return [synthetic_forecast(7, rng.uniform(8, 30), rng.uniform(68, 90)) for _ in range(count)]
+
+
+def synthetic_grid(num_days, seed=17):
+    """Forecast columns for GRID_CELLS cells, shaped (cells, days) as forecast_grid scores them"""
+    rng = np.random.default_rng(seed)
+    shape = (GRID_CELLS, num_days)
+    return (
+        rng.gamma(0.6, 8.0, shape),
+        rng.uniform(0, 100, shape),
+        rng.uniform(0.1, 0.9, shape),
+        rng.uniform(0.5, 18, shape)
+    )
+
+
+def synthetic_daily_probabilities(num_days, seed=19):
+    return np.random.default_rng(seed).uniform(0, 100, num_days)
+
+
+def scan_windows(favorable_probs):
+    """Window ranking step of scan_optimal_dates"""
+    window_means = analysis_engine.sliding_mean(favorable_probs, SCAN_WINDOW)
+    return analysis_engine.top_windows(window_means, SCAN_WINDOW, 5)
+
+
+def synthetic_lookups(count, seed=11):
+    rng = random.Random(seed)
+    return [(rng.uniform(8, 30), rng.uniform(68, 90)) for _ in range(count)]
+
+
+def forecast_csv_analysis(num_days):
+    """Forecast-mode analysis (CSV gets one row per day)"""
+    analysis = app.generate_sample_forecast(18.5, 73.8, 'harvest', 'wheat')
+    analysis['forecast'] = synthetic_forecast(num_days)
+    return analysis
+
+
+def historical_csv_analysis(num_years):
+    """Planning-mode analysis (CSV gets one row per year)"""
+    analysis = app.build_historical_analysis(18.5, 73.8, '2025-07-15', 'harvest', 'wheat', None)
+    analysis['historical_data'] = synthetic_years(num_years)
+    return analysis
+
+
+def write_csv(analysis):
+    return sum(len(chunk) for chunk in app.stream_csv(app.iter_csv_rows(analysis)))
+
+
+# name -> (size label, sizes, build(size) -> input, run(input))
+BENCHMARKS = {
+    'calculate_risk_score': (
+        'forecasts', FORECAST_COUNTS, synthetic_forecasts,
+        lambda forecasts: [app.calculate_risk_score(forecast, 'harvest', 'wheat') for forecast in forecasts]
+    ),
+    'generate_reasoning': (
+        'forecasts', FORECAST_COUNTS, synthetic_forecasts,
+        lambda forecasts: [app.generate_reasoning(forecast, 'harvest', 40) for forecast in forecasts]
+    ),
+    'find_optimal_window': (
+        'forecasts', FORECAST_COUNTS, synthetic_forecasts,
+        lambda forecasts: [app.find_optimal_window(forecast) for forecast in forecasts]
+    ),
+    'risk_scores': (
+        'days', FORECAST_SIZES, synthetic_grid,
+        lambda columns: analysis_engine.risk_scores(*columns, 'harvest')
+    ),
+    'scan_windows': (
+        'days', FORECAST_SIZES, synthetic_daily_probabilities,
+        scan_windows
+    ),
+    'calculate_extreme_events': (
+        'years', YEAR_SIZES, synthetic_years,
+        lambda years: app.calculate_extreme_events(years, 21.0, 7)
+    ),
+    'calculate_climate_trends': (
+        'years', YEAR_SIZES, synthetic_years,
+        app.calculate_climate_trends
+    ),
+    'get_location_name': (
+        'lookups', LOOKUP_SIZES, synthetic_lookups,
+        lambda points: [app.get_location_name(lat, lon) for lat, lon in points]
+    ),
+    'download_csv': (
+        'days', FORECAST_SIZES, forecast_csv_analysis,
+        write_csv
+    ),
+    'download_csv_years': (
+        'years', YEAR_SIZES, historical_csv_analysis,
+        write_csv
+    ),
+}
+
+
+def measure(fn, arg, repeat):
+    """Best seconds per call over `repeat` rounds (each round at least MIN_ROUND_SECONDS)"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn(arg)
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        number *= 2
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn(arg)
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def growth_exponent(sizes, seconds):
+    """Least-squares slope of log(time) against log(size): ~1 linear, ~2 quadratic"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(value, 1e-12)) for value in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def run_benchmarks(names, repeat, max_exponent):
+    results = []
+    for name in names:
+        size_label, sizes, build, fn = BENCHMARKS[name]
+        timings = [measure(fn, build(size), repeat) for size in sizes]
+        exponent = growth_exponent(sizes, timings)
+        results.append({
+            'name': name,
+            'size_label': size_label,
+            'sizes': sizes,
+            'seconds_per_call': timings,
+            'growth_exponent': round(exponent, 3),
+            'passed': exponent <= max_exponent
+        })
+    return results
+
+
+def compare(results, baseline, tolerance_pct):
+    """Per-size slowdowns beyond tolerance against a baseline run; returns (name, size, change%)"""
+    previous = {r['name']: r for r in baseline['results']}
+    slowdowns = []
+    for result in results:
+        before = previous.get(result['name'])
+        if not before:
+            continue
+        before_by_size = dict(zip(before['sizes'], before['seconds_per_call']))
+        for size, seconds in zip(result['sizes'], result['seconds_per_call']):
+            if before_by_size.get(size):
+                change = (seconds - before_by_size[size]) / before_by_size[size] * 100
+                if change > tolerance_pct:
+                    slowdowns.append((result['name'], size, round(change, 1)))
+    return slowdowns
+
+
+def print_table(results, max_exponent):
+    print(f"{'benchmark':<26} {'sizes':<22} {'us/call (smallest -> largest)':<34} {'exponent':>8}")
+    for r in results:
+        sizes = f"{r['size_label']} {r['sizes'][0]}..{r['sizes'][-1]}"
+        timings = f"{r['seconds_per_call'][0] * 1e6:.1f} -> {r['seconds_per_call'][-1] * 1e6:.1f}"
+        flag = '' if r['passed'] else f'  <-- above {max_exponent}'
+        print(f"{r['name']:<26} {sizes:<22} {timings:<34} {r['growth_exponent']:>8.2f}{flag}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Micro-benchmark the analysis functions')
+    parser.add_argument('--only', help='Comma list of benchmarks to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Rounds per size (best is kept)')
+    parser.add_argument('--max-exponent', type=float, default=1.5, help='Largest allowed growth exponent')
+    parser.add_argument('--json', action='store_true', help='Print the run as JSON instead of a table')
+    parser.add_argument('--results', default=MICRO_BENCH_RESULTS_PATH)
+    parser.add_argument('--no-save', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='Compare with the latest run of another commit')
+    parser.add_argument('--baseline', help='Commit to compare with (default: latest other commit)')
+    parser.add_argument('--tolerance-pct', type=float, default=50.0, help='Per-size slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    results = run_benchmarks(names, args.repeat, args.max_exponent)
+    run = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': sys.version.split()[0],
+        'max_exponent': args.max_exponent,
+        'results': results
+    }
+
+    slowdowns = []
+    if args.compare:
+        runs = load_runs(args.results)
+        candidates = [r for r in runs if (r['commit'] == args.baseline if args.baseline else r['commit'] != run['commit'])]
+        if candidates:
+            slowdowns = compare(results, candidates[-1], args.tolerance_pct)
+            run['compared_with'] = candidates[-1]['commit']
+    run['slowdowns'] = [{'name': name, 'size': size, 'change_pct': change} for name, size, change in slowdowns]
+    run['passed'] = all(r['passed'] for r in results) and not slowdowns
+
+    if args.json:
+        print(json.dumps(run, indent=2))
+    else:
+        print_table(results, args.max_exponent)
+        for name, size, change in slowdowns:
+            print(f"  {name} at size {size}: {change:+.1f}% vs {run['compared_with']}")
+        print('\n✅ All thresholds met' if run['passed'] else '\n❌ Threshold check failed')
+
+    if not args.no_save:
+        save_run(args.results, run)
+
+    sys.exit(0 if run['passed'] else 1)
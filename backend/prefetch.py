@@ -0,0 +1,363 @@
+"""
+Background prefetch of hot locations
+Workers count forecast and historical-analysis queries per normalized
+location (and activity/crop) and flush the counts to a small SQLite file
+shared by all workers. A scheduler then keeps the busiest PREFETCH_TOP_K
+locations warm:
+- climatology: during off-peak hours, the next PREFETCH_HORIZON_DAYS of
+  calendar days are loaded into the persistent climatology cache with
+  background rate-limit priority, so the first user of the day does not
+  pay for the cold upstream fetch. One worker at a time holds the warming
+  lease.
+- forecast: each worker refreshes its own in-process forecast cache
+  entries for the top locations before they expire. This is local
+  computation with no upstream calls, so it runs on every tick.
+
+PREFETCH_MODE: 'off' (default), 'track' (count only, warm from a sidecar)
+or 'thread' (count and warm inside each worker).
+
+Sidecar usage:
+    PREFETCH_MODE=track gunicorn app:app
+    python prefetch.py run          # warm loop (climatology only)
+    python prefetch.py once         # one warming pass now, off-peak or not
+    python prefetch.py top --k 20   # show the hottest locations
+"""
+import argparse
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_MODE = os.getenv("PREFETCH_MODE", "off")
+PREFETCH_STATE_PATH = os.getenv(
+    "PREFETCH_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "prefetch.sqlite3")
+)
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", 200))
+PREFETCH_WINDOW_DAYS = int(os.getenv("PREFETCH_WINDOW_DAYS", 14))  # Query counts older than this are dropped
+PREFETCH_HORIZON_DAYS = int(os.getenv("PREFETCH_HORIZON_DAYS", 90))  # Calendar days ahead to warm
+PREFETCH_OFF_PEAK_HOURS = os.getenv("PREFETCH_OFF_PEAK_HOURS", "1-5")  # Local hours, end exclusive; may wrap (22-4)
+PREFETCH_INTERVAL_SECONDS = float(os.getenv("PREFETCH_INTERVAL_SECONDS", 60))
+PREFETCH_REFRESH_HOURS = float(os.getenv("PREFETCH_REFRESH_HOURS", 20))  # Minimum gap between warming passes
+PREFETCH_COMBOS_PER_LOCATION = 3  # Most-queried (activity, crop) pairs refreshed per location
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+_initialized = False
+_stop = threading.Event()
+_thread = None
+_fork_hook_registered = False
+_stats = {'flushes': 0, 'passes': 0, 'locations_warmed': 0, 'forecasts_refreshed': 0,
+          'passes_cut_short': 0, 'last_pass': None}
+_stats_lock = threading.Lock()
+
+
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(PREFETCH_STATE_PATH, timeout=5)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_counts ("
+            " lat TEXT NOT NULL, lon TEXT NOT NULL, activity TEXT NOT NULL, crop TEXT NOT NULL,"
+            " day TEXT NOT NULL, hits INTEGER NOT NULL,"
+            " PRIMARY KEY (lat, lon, activity, crop, day))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS warm_lease ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1), owner TEXT, expires REAL NOT NULL, last_pass REAL NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO warm_lease (id, owner, expires, last_pass) VALUES (1, NULL, 0, 0)")
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def tracking():
+    return PREFETCH_MODE in ('track', 'thread')
+
+
+def record(lat, lon, activity, crop):
+    """Count one query for a normalized location; buffered in memory until the next flush"""
+    if not tracking():
+        return
+    with _pending_lock:
+        _pending[(lat, lon, activity, crop)] += 1
+
+
+def flush():
+    """Write buffered counts to the shared state file and drop counts outside the window"""
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    today = datetime.now().strftime('%Y-%m-%d')
+    cutoff = (datetime.now() - timedelta(days=PREFETCH_WINDOW_DAYS)).strftime('%Y-%m-%d')
+    try:
+        conn = _connect()
+        try:
+            conn.executemany(
+                "INSERT INTO query_counts (lat, lon, activity, crop, day, hits) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (lat, lon, activity, crop, day) DO UPDATE SET hits = hits + excluded.hits",
+                [(*key, today, hits) for key, hits in pending.items()]
+            )
+            conn.execute("DELETE FROM query_counts WHERE day < ?", (cutoff,))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Prefetch counts flush failed: %s", e)
+        return
+    _count('flushes')
+
+
+def top_locations(k=None):
+    """
+    The k most-queried locations over the window, busiest first
+    Returns [(lat, lon, hits, [(activity, crop), ...])] with the most common pairs per location
+    """
+    k = k or PREFETCH_TOP_K
+    cutoff = (datetime.now() - timedelta(days=PREFETCH_WINDOW_DAYS)).strftime('%Y-%m-%d')
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT lat, lon, activity, crop, SUM(hits) FROM query_counts"
+                " WHERE day >= ? GROUP BY lat, lon, activity, crop",
+                (cutoff,)
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Prefetch counts read failed: %s", e)
+        return []
+
+    totals = Counter()
+    combos = {}
+    for lat, lon, activity, crop, hits in rows:
+        totals[(lat, lon)] += hits
+        combos.setdefault((lat, lon), Counter())[(activity, crop)] = hits
+    return [
+        (lat, lon, hits, [combo for combo, _ in combos[(lat, lon)].most_common(PREFETCH_COMBOS_PER_LOCATION)])
+        for (lat, lon), hits in totals.most_common(k)
+    ]
+
+
+def parse_hours(spec):
+    start, end = (int(part) for part in spec.split('-'))
+    return start, end
+
+
+def off_peak(now=None):
+    start, end = parse_hours(PREFETCH_OFF_PEAK_HOURS)
+    hour = (now or datetime.now()).hour
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+
+def _owner():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _take_lease(duration):
+    """Hold the warming lease for duration seconds; False if another worker holds it or a pass ran recently"""
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE warm_lease SET owner = ?, expires = ? WHERE id = 1"
+                " AND (expires < ? OR owner = ?) AND last_pass < ?",
+                (_owner(), now + duration, now, _owner(), now - PREFETCH_REFRESH_HOURS * 3600)
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Prefetch lease unavailable: %s", e)
+        return False
+
+
+def _release_lease(completed):
+    try:
+        conn = _connect()
+        try:
+            conn.execute(
+                "UPDATE warm_lease SET owner = NULL, expires = 0,"
+                " last_pass = CASE WHEN ? THEN ? ELSE last_pass END WHERE id = 1 AND owner = ?",
+                (completed, time.time(), _owner())
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("Prefetch lease release failed: %s", e)
+
+
+def _wait_for_quota(max_wait=60.0):
+    """
+    Block until background work may make another upstream call
+    Returns False when the background share of today's quota is spent, the bucket
+    does not refill within max_wait seconds, or on shutdown
+    """
+    deadline = time.monotonic() + max_wait
+    while not _stop.is_set() and time.monotonic() < deadline:
+        now, today = rate_limiter.background_headroom()
+        if today < 1:
+            return False
+        if now >= 1:
+            return True
+        _stop.wait((1 - now) * 60.0 / rate_limiter.METEOMATICS_RATE_PER_MINUTE)
+    return False
+
+
+def warm_pass(warm_climatology, locations=None, force=False):
+    """
+    Load the next PREFETCH_HORIZON_DAYS of climatology for the top locations
+    warm_climatology(lat, lon, start, num_days) fills the climatology cache for a span
+    Returns the number of locations warmed, or None when another worker has the pass
+    """
+    lease_seconds = max(PREFETCH_INTERVAL_SECONDS * 3, 300)
+    if not force and not _take_lease(lease_seconds):
+        return None
+
+    locations = top_locations() if locations is None else locations
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    warmed = 0
+    completed = True
+    started = time.monotonic()
+    # Upstream calls made here use the background share of the quota
+    with rate_limiter.priority(rate_limiter.BACKGROUND):
+        for lat, lon, _, _ in locations:
+            if not force and not off_peak():
+                completed = False
+                break
+            if not _wait_for_quota():
+                completed = False
+                break
+            warm_climatology(float(lat), float(lon), start, PREFETCH_HORIZON_DAYS)
+            warmed += 1
+            if not force:
+                _take_lease(lease_seconds)  # Renew while the pass is still going
+
+    if not force:
+        _release_lease(completed)
+    if not completed:
+        _count('passes_cut_short')
+    _count('passes')
+    _count('locations_warmed', warmed)
+    with _stats_lock:
+        _stats['last_pass'] = datetime.utcnow().isoformat()
+    logger.info("Prefetch pass finished", extra={
+        'locations': warmed, 'of': len(locations), 'completed': completed,
+        'seconds': round(time.monotonic() - started, 2)
+    })
+    return warmed
+
+
+def refresh_forecasts(refresh_forecast, locations):
+    """Refresh this worker's forecast cache entries for the top locations; refresh_forecast returns True if recomputed"""
+    refreshed = 0
+    for lat, lon, _, combos in locations:
+        for activity, crop in combos:
+            if refresh_forecast(lat, lon, activity, crop):
+                refreshed += 1
+    _count('forecasts_refreshed', refreshed)
+    return refreshed
+
+
+def run(warm_climatology=None, refresh_forecast=None):
+    """Scheduler loop: flush counts, refresh forecasts and, off-peak, warm the climatology cache"""
+    while not _stop.is_set():
+        try:
+            flush()
+            if warm_climatology or refresh_forecast:
+                locations = top_locations()
+                if refresh_forecast:
+                    refresh_forecasts(refresh_forecast, locations)
+                if warm_climatology and locations and off_peak():
+                    warm_pass(warm_climatology, locations)
+        except Exception:
+            logger.exception("Prefetch tick failed")
+        _stop.wait(PREFETCH_INTERVAL_SECONDS)
+
+
+def start(warm_climatology, refresh_forecast):
+    """Start the in-process scheduler for the configured PREFETCH_MODE"""
+    global _thread, _fork_hook_registered
+    if not tracking() or _thread is not None:
+        return
+    if PREFETCH_MODE != 'thread':
+        # Counting only; a sidecar does the warming
+        warm_climatology = refresh_forecast = None
+    _thread = threading.Thread(
+        target=run, args=(warm_climatology, refresh_forecast), name='prefetch', daemon=True
+    )
+    _thread.start()
+    if not _fork_hook_registered:
+        # The thread does not survive fork (gunicorn --preload), so restart it in each worker
+        os.register_at_fork(after_in_child=lambda: _restart_after_fork(warm_climatology, refresh_forecast))
+        _fork_hook_registered = True
+
+
+def _restart_after_fork(warm_climatology, refresh_forecast):
+    """Give a forked worker its own empty buffer, fresh locks and a running scheduler thread"""
+    global _pending_lock, _stats_lock, _stop, _thread
+    _pending_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _pending.clear()
+    _stop = threading.Event()
+    _thread = None
+    start(warm_climatology, refresh_forecast)
+
+
+def stop():
+    _stop.set()
+    if tracking():
+        flush()
+
+
+def stats():
+    with _pending_lock:
+        pending = sum(_pending.values())
+    with _stats_lock:
+        snapshot = dict(_stats)
+    return {'mode': PREFETCH_MODE, 'pending_counts': pending, 'off_peak_hours': PREFETCH_OFF_PEAK_HOURS, **snapshot}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Warm caches for the most-queried locations')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('run', help='Warm the climatology cache every off-peak window')
+    commands.add_parser('once', help='Run one warming pass now, ignoring the off-peak window')
+    top_parser = commands.add_parser('top', help='Show the most-queried locations')
+    top_parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == 'top':
+        for lat, lon, hits, combos in top_locations(args.k):
+            print(f'{lat:>9} {lon:>9} {hits:>7}  ' + ', '.join(f'{a}/{c}' for a, c in combos))
+    else:
+        # app is only needed for the cache-filling path, so it is imported here
+        os.environ.setdefault('STARTUP_PROBE', 'off')
+        from app import load_climatology_range
+        import prefetch  # The module instance app uses, not this __main__ copy
+
+        if args.command == 'once':
+            warmed = prefetch.warm_pass(load_climatology_range, force=True)
+            print(f'🔥 Warmed {warmed} locations x {PREFETCH_HORIZON_DAYS} days')
+        else:
+            print(f'🔥 Prefetch sidecar running (off-peak hours {PREFETCH_OFF_PEAK_HOURS})')
+            prefetch.run(warm_climatology=load_climatology_range)
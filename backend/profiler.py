@@ -0,0 +1,186 @@
+"""
+Opt-in request profiler for hot-path analysis
+A request carrying ?profile=1 (or X-Profile: 1) and a matching X-Admin-Token
+runs the decorated functions under a profiler and stores the result in
+PROFILE_DIR; the response names it in X-Profile-Id. Formats:
+- pstats (default): cProfile output, open with `python -m pstats` or snakeviz
+- speedscope: evented call timeline for https://www.speedscope.app
+Profiling is disabled unless PROFILE_ADMIN_TOKEN is set, and un-flagged
+requests only pay for one attribute lookup. Profiled requests skip the
+response caches so the work being measured actually runs.
+"""
+import cProfile
+import functools
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import Response, g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+)
+PROFILE_FORMATS = ['pstats', 'speedscope']
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Only one profiler may be active per process (cProfile hooks are not reentrant)
+_active = threading.Lock()
+
+
+def requested_by(request):
+    """Profiling format asked for by an authorized request, or None"""
+    if not PROFILE_ADMIN_TOKEN:
+        return None
+    flag = request.args.get('profile') or request.headers.get('X-Profile')
+    if flag not in ('1', 'true') or not authorized(request):
+        return None
+    format_type = request.args.get('profile_format', 'pstats')
+    return format_type if format_type in PROFILE_FORMATS else 'pstats'
+
+
+def authorized(request):
+    """True if the request carries the admin token (always False while profiling is disabled)"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(PROFILE_ADMIN_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_ADMIN_TOKEN.encode())
+
+
+def active():
+    """True while handling a request that asked for a profile"""
+    return has_request_context() and g.get('profile_format') is not None
+
+
+def profiled(name):
+    """Profile calls to the decorated function when the current request asked for it"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not active() or g.get('profile_id'):
+                return fn(*args, **kwargs)
+            if not _active.acquire(blocking=False):
+                g.profile_id = 'busy'
+                return fn(*args, **kwargs)
+            try:
+                return _run_profiled(name, g.profile_format, fn, args, kwargs)
+            finally:
+                _active.release()
+        return wrapper
+    return decorator
+
+
+def _run_profiled(name, format_type, fn, args, kwargs):
+    collector = cProfile.Profile() if format_type == 'pstats' else _EventTracer()
+    collector.enable()
+    try:
+        result = fn(*args, **kwargs)
+        # Streamed bodies are produced after the view returns, so buffer them here
+        if isinstance(result, Response) and result.is_streamed:
+            result.get_data()
+    finally:
+        collector.disable()
+
+    profile_id = uuid.uuid4().hex
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = profile_path(profile_id, format_type)
+    if format_type == 'pstats':
+        collector.dump_stats(path)
+    else:
+        with open(path, 'w') as f:
+            json.dump(collector.speedscope(name), f)
+    g.profile_id = profile_id
+    logger.info("Profiled %s -> %s", name, os.path.basename(path))
+    return result
+
+
+def profile_path(profile_id, format_type):
+    extension = 'pstats' if format_type == 'pstats' else 'speedscope.json'
+    return os.path.join(PROFILE_DIR, f'{profile_id}.{extension}')
+
+
+def find(profile_id):
+    """(path, format) of a stored profile, or None"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    for format_type in PROFILE_FORMATS:
+        path = profile_path(profile_id, format_type)
+        if os.path.exists(path):
+            return path, format_type
+    return None
+
+
+class _EventTracer:
+    """Records open/close events for every Python and C call on this thread (speedscope 'evented')"""
+
+    def __init__(self):
+        self.frames = []
+        self.frame_index = {}
+        self.events = []
+        self.started = None
+
+    def enable(self):
+        self.started = time.perf_counter()
+        sys.setprofile(self._trace)
+
+    def disable(self):
+        sys.setprofile(None)
+
+    def _frame(self, key, name, file, line):
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append({'name': name, 'file': file, 'line': line})
+        return index
+
+    def _trace(self, frame, event, arg):
+        at = time.perf_counter() - self.started
+        if event in ('call', 'return'):
+            code = frame.f_code
+            index = self._frame(code, code.co_name, code.co_filename, code.co_firstlineno)
+        else:
+            name = getattr(arg, '__qualname__', None) or getattr(arg, '__name__', repr(arg))
+            module = getattr(arg, '__module__', None) or 'builtins'
+            index = self._frame(('c', module, name), f'{module}.{name}', module, 0)
+        if event in ('call', 'c_call'):
+            self.events.append({'type': 'O', 'frame': index, 'at': at})
+        else:
+            self.events.append({'type': 'C', 'frame': index, 'at': at})
+
+    def speedscope(self, name):
+        # speedscope needs balanced events: drop closes of frames opened before
+        # tracing started and close frames still open when it stopped
+        stack = []
+        events = []
+        for event in self.events:
+            if event['type'] == 'O':
+                stack.append(event['frame'])
+            elif stack and stack[-1] == event['frame']:
+                stack.pop()
+            else:
+                continue
+            events.append(event)
+        end = events[-1]['at'] if events else 0.0
+        events.extend({'type': 'C', 'frame': index, 'at': end} for index in reversed(stack))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'evented',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0.0,
+                'endValue': end,
+                'events': events
+            }],
+            'name': name,
+            'exporter': 'weatherwise profiler'
+        }
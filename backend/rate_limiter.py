@@ -0,0 +1,224 @@
+"""
+Token-bucket rate limiter and quota accounting for Meteomatics calls
+The bucket and the daily counter live in a small SQLite file, so every
+gunicorn worker on the host draws from the same per-minute and daily quota.
+Interactive calls may use the whole quota; background calls (cache warm-up)
+must leave RATE_LIMIT_BACKGROUND_RESERVE of it for interactive traffic.
+"""
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+METEOMATICS_RATE_PER_MINUTE = int(os.getenv("METEOMATICS_RATE_PER_MINUTE", 60))
+METEOMATICS_DAILY_QUOTA = int(os.getenv("METEOMATICS_DAILY_QUOTA", 5000))
+RATE_LIMIT_BACKGROUND_RESERVE = float(os.getenv("RATE_LIMIT_BACKGROUND_RESERVE", 0.5))
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", 2))
+RATE_LIMIT_STATE_PATH = os.getenv(
+    "RATE_LIMIT_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_limit.sqlite3")
+)
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_priority = contextvars.ContextVar('upstream_priority', default=INTERACTIVE)
+_denied = {INTERACTIVE: 0, BACKGROUND: 0}
+_denied_lock = threading.Lock()
+_initialized = False
+
+
+class RateLimitedError(Exception):
+    """Raised when the upstream quota does not allow another call"""
+
+
+@contextmanager
+def priority(level):
+    """Run upstream calls made inside the block with the given priority class"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(RATE_LIMIT_STATE_PATH, timeout=5, isolation_level=None)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bucket ("
+            " id INTEGER PRIMARY KEY CHECK (id = 1),"
+            " tokens REAL NOT NULL,"
+            " updated REAL NOT NULL,"
+            " day TEXT NOT NULL,"
+            " used_today INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO bucket (id, tokens, updated, day, used_today) VALUES (1, ?, ?, ?, 0)",
+            (METEOMATICS_RATE_PER_MINUTE, time.time(), _today())
+        )
+        _initialized = True
+    return conn
+
+
+def _today():
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+
+def _refill(tokens, updated, day, used_today, now):
+    """Apply the elapsed refill and the daily reset to a stored bucket state"""
+    rate_per_second = METEOMATICS_RATE_PER_MINUTE / 60.0
+    tokens = min(METEOMATICS_RATE_PER_MINUTE, tokens + (now - updated) * rate_per_second)
+    today = _today()
+    if day != today:
+        day, used_today = today, 0
+    return tokens, day, used_today
+
+
+def _try_acquire(level):
+    """
+    Take one token if the priority class allows it
+    Returns (granted, seconds_until_worth_retrying or None if the daily quota is spent)
+    """
+    reserve = RATE_LIMIT_BACKGROUND_RESERVE if level == BACKGROUND else 0.0
+    token_floor = METEOMATICS_RATE_PER_MINUTE * reserve
+    daily_floor = METEOMATICS_DAILY_QUOTA * reserve
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        tokens, updated, day, used_today = conn.execute(
+            "SELECT tokens, updated, day, used_today FROM bucket WHERE id = 1"
+        ).fetchone()
+        now = time.time()
+        tokens, day, used_today = _refill(tokens, updated, day, used_today, now)
+
+        if METEOMATICS_DAILY_QUOTA - used_today <= daily_floor:
+            conn.execute("COMMIT")
+            return False, None
+
+        granted = tokens - 1 >= token_floor
+        if granted:
+            tokens -= 1
+            used_today += 1
+        conn.execute(
+            "UPDATE bucket SET tokens = ?, updated = ?, day = ?, used_today = ? WHERE id = 1",
+            (tokens, now, day, used_today)
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    if granted:
+        return True, 0.0
+    return False, (token_floor + 1 - tokens) * 60.0 / METEOMATICS_RATE_PER_MINUTE
+
+
+def acquire(level=None, max_wait=None):
+    """
+    Reserve quota for one upstream call, waiting briefly for the bucket to refill
+    Background calls never wait. Raises RateLimitedError when no quota is available.
+    """
+    level = level or current_priority()
+    deadline = _deadline(level, max_wait)
+    while True:
+        wait = _wait_before_retry(level, deadline, _attempt(level))
+        if wait is None:
+            return
+        time.sleep(wait)
+
+
+def _deadline(level, max_wait):
+    if max_wait is None:
+        max_wait = RATE_LIMIT_MAX_WAIT_SECONDS if level == INTERACTIVE else 0.0
+    return time.monotonic() + max_wait
+
+
+def _attempt(level):
+    """One _try_acquire, granting the call when the state file is unusable"""
+    try:
+        return _try_acquire(level)
+    except sqlite3.Error as e:
+        # Never block upstream calls on a broken state file
+        logger.warning("Rate limiter state unavailable: %s", e)
+        return True, None
+
+
+def _wait_before_retry(level, deadline, outcome):
+    """Seconds to wait before the next attempt, or None once granted; raises when waiting cannot help"""
+    granted, retry_after = outcome
+    if granted:
+        return None
+    if retry_after is None or retry_after > deadline - time.monotonic():
+        with _denied_lock:
+            _denied[level] += 1
+        raise RateLimitedError(f'Meteomatics quota exhausted for {level} calls')
+    return retry_after
+
+
+def usage():
+    """Quota used and remaining (shared across workers) plus this worker's denials"""
+    try:
+        conn = _connect()
+        try:
+            tokens, updated, day, used_today = conn.execute(
+                "SELECT tokens, updated, day, used_today FROM bucket WHERE id = 1"
+            ).fetchone()
+        finally:
+            conn.close()
+        tokens, day, used_today = _refill(tokens, updated, day, used_today, time.time())
+    except sqlite3.Error:
+        tokens, used_today = 0.0, 0
+
+    with _denied_lock:
+        denied = dict(_denied)
+
+    return {
+        'per_minute_limit': METEOMATICS_RATE_PER_MINUTE,
+        'tokens_available': round(tokens, 2),
+        'daily_quota': METEOMATICS_DAILY_QUOTA,
+        'used_today': used_today,
+        'remaining_today': max(0, METEOMATICS_DAILY_QUOTA - used_today),
+        'denied': denied
+    }
+
+
+def background_headroom():
+    """
+    (calls now, calls today) that background work may still make before touching
+    the interactive reserve; lets schedulers pace themselves instead of being refused
+    """
+    quota = usage()
+    return (
+        quota['tokens_available'] - METEOMATICS_RATE_PER_MINUTE * RATE_LIMIT_BACKGROUND_RESERVE,
+        quota['remaining_today'] - METEOMATICS_DAILY_QUOTA * RATE_LIMIT_BACKGROUND_RESERVE
+    )
+
+
+async def acquire_async(level=None, max_wait=None):
+    """
+    acquire() for event loops: the SQLite attempt runs in the loop's executor and waits use
+    asyncio.sleep, so a locked state file never stalls the other coroutines on the loop
+    """
+    import asyncio
+
+    level = level or current_priority()
+    deadline = _deadline(level, max_wait)
+    loop = asyncio.get_running_loop()
+    while True:
+        wait = _wait_before_retry(level, deadline, await loop.run_in_executor(None, _attempt, level))
+        if wait is None:
+            return
+        await asyncio.sleep(wait)
@@ -0,0 +1,101 @@
+"""
+In-process TTL/LRU cache for computed API responses
+Each gunicorn worker keeps its own bounded copy
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSE_CACHE_COORD_PRECISION = int(os.getenv("RESPONSE_CACHE_COORD_PRECISION", 3))
+
+
+def normalize_coordinate(value):
+    """Round a coordinate so nearby spellings of the same point share a cache entry"""
+    return str(round(float(value), RESPONSE_CACHE_COORD_PRECISION))
+
+
+class TTLCache:
+    """Bounded least-recently-used cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, name, max_entries, ttl_seconds):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def refresh(self, key, compute, min_ttl_seconds):
+        """
+        Recompute an entry that is missing or expires within min_ttl_seconds
+        Used by background warming, so hit/miss counters are left alone; returns True if recomputed
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] - time.monotonic() > min_ttl_seconds:
+            return False
+        self.set(key, compute())
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+forecast_cache = TTLCache(
+    'forecast',
+    max_entries=int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", 2048)),
+    ttl_seconds=float(os.getenv("FORECAST_CACHE_TTL_SECONDS", 300))
+)
+historical_cache = TTLCache(
+    'historical_analysis',
+    max_entries=int(os.getenv("HISTORICAL_CACHE_MAX_ENTRIES", 2048)),
+    ttl_seconds=float(os.getenv("HISTORICAL_CACHE_TTL_SECONDS", 3600))
+)
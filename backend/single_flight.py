@@ -0,0 +1,118 @@
+"""
+Request coalescing (single-flight)
+Concurrent callers asking for the same key share one computation: the first
+caller (leader) runs it, the others (followers) wait for its result.
+Optionally coordinates across worker processes with per-key file locks.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-worker locking unavailable
+    fcntl = None
+
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", 30))
+# Directory for cross-worker lock files; unset keeps coalescing within one worker
+SINGLE_FLIGHT_LOCK_DIR = os.getenv("SINGLE_FLIGHT_LOCK_DIR")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key within one process"""
+
+    def __init__(self, timeout=SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.follower_timeouts = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() once per key among concurrent callers
+        Followers that wait longer than the timeout run fn() themselves
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                self.followers += 1
+                leader = False
+
+        if not leader:
+            if call.done.wait(self.timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            with self._lock:
+                self.follower_timeouts += 1
+            return fn()
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.done.set()
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'follower_timeouts': self.follower_timeouts
+            }
+
+
+@contextmanager
+def worker_lock(key, timeout=SINGLE_FLIGHT_TIMEOUT_SECONDS):
+    """
+    Hold an exclusive per-key file lock shared by all workers on this host
+    Yields True when the lock was acquired, False when locking is disabled
+    or the timeout passed (the caller then proceeds without it)
+    """
+    if not SINGLE_FLIGHT_LOCK_DIR or fcntl is None:
+        yield False
+        return
+
+    os.makedirs(SINGLE_FLIGHT_LOCK_DIR, exist_ok=True)
+    digest = hashlib.sha1(str(key).encode()).hexdigest()
+    path = os.path.join(SINGLE_FLIGHT_LOCK_DIR, f"{digest}.lock")
+
+    with open(path, "w") as lock_file:
+        deadline = time.monotonic() + timeout
+        acquired = False
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
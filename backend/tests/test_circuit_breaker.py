@@ -0,0 +1,92 @@
+"""Circuit breaker state transitions and which upstream answers count against it"""
+import circuit_breaker
+import meteomatics_client
+from circuit_breaker import CircuitBreaker
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def tripped_breaker(cool_down=60):
+    breaker = CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=10, cool_down=cool_down)
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    return breaker
+
+
+def test_stays_closed_below_min_calls_and_failure_rate():
+    breaker = CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=10, cool_down=60)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == circuit_breaker.CLOSED
+
+    # 3 failures out of 7 calls stays under the 50% rate
+    for _ in range(4):
+        breaker.record_success()
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_opens_at_failure_rate_and_refuses_calls():
+    breaker = tripped_breaker()
+    assert breaker.state == circuit_breaker.OPEN
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+    assert breaker.stats()['short_circuited'] == 1
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = tripped_breaker(cool_down=30)
+    breaker.opened_at -= 31  # Cool-down elapsed
+
+    assert not breaker.is_open()
+    assert breaker.allow_request()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.allow_request()
+    assert breaker.is_open()
+
+
+def test_successful_trial_closes():
+    breaker = tripped_breaker(cool_down=0)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.stats()['recent_failures'] == 0
+    assert breaker.allow_request()
+
+
+def test_failed_trial_reopens():
+    breaker = tripped_breaker(cool_down=30)
+    breaker.opened_at -= 31
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == circuit_breaker.OPEN
+    # A fresh cool-down starts from the failed trial
+    assert not breaker.allow_request()
+
+
+def test_released_trial_can_be_retried():
+    breaker = tripped_breaker(cool_down=0)
+    assert breaker.allow_request()
+    # e.g. the call was rate limited and never went upstream
+    breaker.release_request()
+    assert breaker.allow_request()
+
+
+def test_only_upstream_faults_count_as_failures(monkeypatch):
+    breaker = CircuitBreaker('test', failure_rate=0.5, min_calls=4, window=10, cool_down=60)
+    monkeypatch.setattr(meteomatics_client, 'breaker', breaker)
+
+    # Bad input (e.g. lat=95) must not open the circuit for everyone
+    for status in [400, 404, 400, 422, 400]:
+        meteomatics_client.record_response(FakeResponse(status))
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.stats()['recent_failures'] == 0
+
+    for status in [500, 429, 503, 502, 504, 429]:
+        meteomatics_client.record_response(FakeResponse(status))
+    assert breaker.state == circuit_breaker.OPEN
@@ -0,0 +1,92 @@
+"""Climatology cache keying by grid cell, LRU eviction and cell-centre fetches"""
+import os
+import tempfile
+
+import pytest
+
+_state_dir = tempfile.mkdtemp()
+os.environ.setdefault('STARTUP_PROBE', 'off')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('RATE_LIMIT_STATE_PATH', os.path.join(_state_dir, 'rate_limit.sqlite3'))
+os.environ.setdefault('CLIMATOLOGY_CACHE_PATH', os.path.join(_state_dir, 'climatology.sqlite3'))
+os.environ.setdefault('EXPORT_STORE_PATH', os.path.join(_state_dir, 'exports.sqlite3'))
+
+import app
+import climatology_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    clock = FakeClock()
+    monkeypatch.setattr(climatology_cache, 'CLIMATOLOGY_CACHE_PATH', str(tmp_path / 'climatology.sqlite3'))
+    monkeypatch.setattr(climatology_cache, 'CLIMATOLOGY_CACHE_MAX_ENTRIES', 2)
+    monkeypatch.setattr(climatology_cache, 'CLIMATOLOGY_CACHE_TOUCH_SECONDS', 3600)
+    monkeypatch.setattr(climatology_cache, '_initialized', False)
+    monkeypatch.setattr(climatology_cache, 'time', clock)
+    return clock
+
+
+def records(year):
+    return [{'year': year}]
+
+
+def test_points_in_one_cell_share_a_key():
+    assert climatology_cache.cache_key(18.52, 73.84, 7, 15) == climatology_cache.cache_key('18.48', '73.76', 7, 15)
+    assert climatology_cache.cache_key(18.52, 73.84, 7, 15) == '18.500000,73.800000,07-15'
+    assert climatology_cache.cache_key(18.56, 73.84, 7, 15) != climatology_cache.cache_key(18.52, 73.84, 7, 15)
+    assert climatology_cache.cache_key(18.52, 73.84, 7, 16) != climatology_cache.cache_key(18.52, 73.84, 7, 15)
+
+
+def test_evicts_least_recently_accessed(cache):
+    climatology_cache.put(10.0, 70.0, 1, 1, records(1))
+    cache.now += 7200
+    climatology_cache.put(11.0, 70.0, 1, 1, records(2))
+    cache.now += 7200
+    # An hour-old entry gets its last_access refreshed by a read
+    assert climatology_cache.get(10.0, 70.0, 1, 1) == records(1)
+    cache.now += 7200
+    climatology_cache.put(12.0, 70.0, 1, 1, records(3))
+
+    assert climatology_cache.get(11.0, 70.0, 1, 1) is None
+    assert climatology_cache.get(10.0, 70.0, 1, 1) == records(1)
+    assert climatology_cache.get(12.0, 70.0, 1, 1) == records(3)
+
+
+def test_recent_reads_do_not_rewrite_last_access(cache):
+    climatology_cache.put(10.0, 70.0, 1, 1, records(1))
+    cache.now += 60
+    climatology_cache.put(11.0, 70.0, 1, 1, records(2))
+    cache.now += 60
+    # Within CLIMATOLOGY_CACHE_TOUCH_SECONDS, so the read leaves the LRU order alone
+    assert climatology_cache.get(10.0, 70.0, 1, 1) == records(1)
+    cache.now += 60
+    climatology_cache.put(12.0, 70.0, 1, 1, records(3))
+
+    assert climatology_cache.get(10.0, 70.0, 1, 1) is None
+    assert climatology_cache.get(11.0, 70.0, 1, 1) == records(2)
+
+
+def test_records_are_fetched_at_the_cell_centre(cache, monkeypatch):
+    fetched = []
+
+    def fake_fetch(lat, lon, target_date):
+        fetched.append((lat, lon))
+        return [dict(record, lat=lat) for record in records(2020)]
+
+    monkeypatch.setattr(app, 'fetch_real_meteomatics_data', fake_fetch)
+    monkeypatch.setattr(app.climatology_store, 'lookup_records', lambda *args: None)
+
+    first = app.load_historical_records('18.52', '73.84', '2026-07-15')
+    second = app.load_historical_records('18.48', '73.76', '2026-07-15')
+
+    # One fetch for the cell, at its centre, whichever point asked first
+    assert fetched == [(18.5, 73.8)]
+    assert first == second
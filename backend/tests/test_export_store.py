@@ -0,0 +1,67 @@
+"""Analyses stored server-side can be downloaded again by their ID"""
+import json
+import os
+import tempfile
+
+import pytest
+
+_state_dir = tempfile.mkdtemp()
+os.environ.setdefault('STARTUP_PROBE', 'off')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('RATE_LIMIT_STATE_PATH', os.path.join(_state_dir, 'rate_limit.sqlite3'))
+os.environ.setdefault('CLIMATOLOGY_CACHE_PATH', os.path.join(_state_dir, 'climatology.sqlite3'))
+os.environ.setdefault('EXPORT_STORE_PATH', os.path.join(_state_dir, 'exports.sqlite3'))
+
+import app
+import export_store
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(export_store, 'EXPORT_STORE_PATH', str(tmp_path / 'exports.sqlite3'))
+    monkeypatch.setattr(export_store, '_initialized', False)
+    monkeypatch.setattr(export_store, '_recent', {})
+    app.forecast_cache.clear()
+    return app.app.test_client()
+
+
+def test_put_and_get_round_trip(client):
+    analysis = {'location': {'name': 'Test'}, 'values': [1, 2.5, None], 'nested': {'b': 1, 'a': 2}}
+    export_id = export_store.put(analysis)
+
+    assert export_id == export_store.analysis_id(analysis)
+    assert export_store.put(json.loads(json.dumps(analysis))) == export_id
+    stored, seconds_left = export_store.get(export_id)
+    assert stored == analysis
+    assert seconds_left > 0
+
+
+def test_unknown_or_expired_ids_are_not_found(client, monkeypatch):
+    assert export_store.get('0' * export_store.EXPORT_ID_LENGTH) == (None, 0)
+
+    monkeypatch.setattr(export_store, 'EXPORT_TTL_SECONDS', -1)
+    export_id = export_store.put({'location': {'name': 'Gone'}})
+    assert export_store.get(export_id) == (None, 0)
+
+
+def test_forecast_downloads_by_id(client):
+    forecast = client.get('/api/forecast?lat=18.5&lon=73.8&activity=harvest&crop=wheat').get_json()
+    analysis_id = forecast.pop('analysis_id')
+
+    response = client.get(f'/api/download/{analysis_id}?format=json')
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == forecast
+    assert 'immutable' in response.headers['Cache-Control']
+
+    # A cache hit hands out the same ID
+    again = client.get('/api/forecast?lat=18.5&lon=73.8&activity=harvest&crop=wheat').get_json()
+    assert again['analysis_id'] == analysis_id
+
+    csv = client.get(f'/api/download/{analysis_id}?format=csv')
+    assert csv.status_code == 200
+    assert csv.headers['Content-Type'].startswith('text/csv')
+
+
+def test_download_of_unknown_id_is_404(client):
+    assert client.get('/api/download/doesnotexist?format=json').status_code == 404
+    assert client.get('/api/download/doesnotexist?format=xml').status_code == 400
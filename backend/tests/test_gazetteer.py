@@ -0,0 +1,74 @@
+"""Gazetteer nearest-place lookups against a brute-force great-circle search"""
+import math
+import random
+
+import pytest
+
+import gazetteer
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * gazetteer.EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def random_places(count, seed=3):
+    rng = random.Random(seed)
+    places = [(rng.uniform(-90, 90), rng.uniform(-180, 180), f'Place {i}') for i in range(count)]
+    # Points around the poles and the antimeridian, where planar distances go wrong
+    places += [(89.9, 10.0, 'North'), (-89.9, -170.0, 'South'), (10.0, 179.95, 'East'), (10.0, -179.95, 'West')]
+    return places
+
+
+@pytest.fixture
+def index(tmp_path):
+    places = random_places(2000)
+    out_dir = str(tmp_path / 'gazetteer')
+    assert gazetteer.build(places, out_dir) == len(places)
+    return places, gazetteer.GazetteerIndex(out_dir)
+
+
+def test_nearest_matches_brute_force(index):
+    places, built = index
+    rng = random.Random(5)
+    queries = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(300)]
+    queries += [(90.0, 0.0), (-90.0, 0.0), (10.0, 180.0), (10.0, -180.0), (0.0, 0.0)]
+
+    for lat, lon in queries:
+        position, distance_km = built.nearest(lat, lon)
+        expected = min(haversine_km(lat, lon, p_lat, p_lon) for p_lat, p_lon, _ in places)
+        assert distance_km == pytest.approx(expected, abs=1e-6)
+        name = built.name(position)
+        p_lat, p_lon = next((p[0], p[1]) for p in places if p[2] == name)
+        assert haversine_km(lat, lon, p_lat, p_lon) == pytest.approx(expected, abs=1e-6)
+
+
+def test_empty_place_list_is_not_published(tmp_path):
+    out_dir = str(tmp_path / 'gazetteer')
+    gazetteer.build([(18.5, 73.8, 'Pune')], out_dir)
+    with pytest.raises(ValueError):
+        gazetteer.build([], out_dir)
+    assert gazetteer.GazetteerIndex(out_dir).name(0) == 'Pune'
+
+
+def test_rebuild_replaces_a_stale_old_dir(tmp_path):
+    out_dir = str(tmp_path / 'gazetteer')
+    gazetteer.build([(18.5, 73.8, 'Pune')], out_dir)
+    (tmp_path / 'gazetteer.old').mkdir()
+    (tmp_path / 'gazetteer.old' / 'names.bin').write_bytes(b'stale')
+
+    gazetteer.build([(19.1, 72.9, 'Mumbai')], out_dir)
+    assert gazetteer.GazetteerIndex(out_dir).name(0) == 'Mumbai'
+    assert not (tmp_path / 'gazetteer.old').exists()
+
+
+def test_unusable_index_counts_as_absent(tmp_path, monkeypatch):
+    out_dir = str(tmp_path / 'gazetteer')
+    gazetteer.build([(18.5, 73.8, '')], out_dir)  # Zero-byte names.bin cannot be mapped
+    monkeypatch.setattr(gazetteer, 'GAZETTEER_PATH', out_dir)
+    monkeypatch.setattr(gazetteer, '_index', None)
+    monkeypatch.setattr(gazetteer, '_missing', False)
+
+    assert gazetteer.get_index() is None
+    assert not gazetteer.available()
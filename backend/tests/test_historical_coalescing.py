@@ -0,0 +1,59 @@
+"""Coalesced historical fetches must not leak one request's analysis into another"""
+import os
+import tempfile
+import threading
+import time
+
+_state_dir = tempfile.mkdtemp()
+os.environ.setdefault('STARTUP_PROBE', 'off')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('RATE_LIMIT_STATE_PATH', os.path.join(_state_dir, 'rate_limit.sqlite3'))
+os.environ.setdefault('CLIMATOLOGY_CACHE_PATH', os.path.join(_state_dir, 'climatology.sqlite3'))
+os.environ.setdefault('EXPORT_STORE_PATH', os.path.join(_state_dir, 'exports.sqlite3'))
+
+import app
+
+ACTIVITIES = ['harvest', 'planting', 'spraying']
+
+
+def fake_records():
+    values = {'t_2m:C': 29.0, 'precip_24h:mm': 12.0, 'relative_humidity_2m:p': 70.0, 'wind_speed_10m:ms': 4.0}
+    records = []
+    for year in range(2014, 2024):
+        # Alternate wet and dry years so the favorable rule differs per activity
+        record_values = dict(values, **{'precip_24h:mm': 12.0 if year % 2 else 0.0})
+        records.append(app.build_year_record(year, 7, 15, record_values))
+    return records
+
+
+def test_coalesced_callers_get_independent_analyses(monkeypatch):
+    shared = fake_records()
+    barrier = threading.Barrier(len(ACTIVITIES))
+
+    def slow_fetch(lat, lon, target_date):
+        time.sleep(0.3)  # Keep the leader in flight while the followers join
+        return shared
+
+    monkeypatch.setattr(app, 'fetch_real_meteomatics_data', slow_fetch)
+    monkeypatch.setattr(app.climatology_cache, 'put', lambda *args: None)
+
+    results = {}
+
+    def run(activity):
+        barrier.wait()
+        results[activity] = app.generate_historical_analysis('18.5', '73.8', '2026-07-15', activity, 'wheat')
+
+    threads = [threading.Thread(target=run, args=(activity,)) for activity in ACTIVITIES]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert app.upstream_flight.stats()['followers'] >= 1
+    for activity in ACTIVITIES:
+        expected = app.build_historical_analysis('18.5', '73.8', '2026-07-15', activity, 'wheat', fake_records())
+        assert results[activity]['statistics'] == expected['statistics']
+        assert results[activity]['statistics']['total_years_analyzed'] == 30
+    # The shared list itself is left untouched
+    assert len(shared) == 10
+    assert all(year['was_favorable'] is True for year in shared)
@@ -0,0 +1,52 @@
+"""Climatology range fetches split at the year end and map onto each past year"""
+import os
+import tempfile
+from datetime import datetime
+
+_state_dir = tempfile.mkdtemp()
+os.environ.setdefault('STARTUP_PROBE', 'off')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ.setdefault('RATE_LIMIT_STATE_PATH', os.path.join(_state_dir, 'rate_limit.sqlite3'))
+os.environ.setdefault('CLIMATOLOGY_CACHE_PATH', os.path.join(_state_dir, 'climatology.sqlite3'))
+os.environ.setdefault('EXPORT_STORE_PATH', os.path.join(_state_dir, 'exports.sqlite3'))
+
+import app
+
+
+def test_span_within_a_year_is_one_range_per_year():
+    assert app.build_range_timestamps(datetime(2026, 6, 1), 3, [2019, 2020]) == [
+        '2019-06-01T12:00:00Z--2019-06-03T12:00:00Z:P1D',
+        '2020-06-01T12:00:00Z--2020-06-03T12:00:00Z:P1D',
+    ]
+
+
+def test_span_across_new_year_is_split_at_dec_31():
+    # Dec 30 - Jan 2: both parts of the span use the same past year
+    assert app.build_range_timestamps(datetime(2025, 12, 30), 4, [2019, 2020]) == [
+        '2019-12-30T12:00:00Z--2019-12-31T12:00:00Z:P1D',
+        '2019-01-01T12:00:00Z--2019-01-02T12:00:00Z:P1D',
+        '2020-12-30T12:00:00Z--2020-12-31T12:00:00Z:P1D',
+        '2020-01-01T12:00:00Z--2020-01-02T12:00:00Z:P1D',
+    ]
+
+
+def test_every_calendar_day_gets_every_year():
+    years = list(range(2014, 2024))
+    start = datetime(2025, 12, 25)
+    num_days = 14
+    covered = {}
+    for spec in app.build_range_timestamps(start, num_days, years):
+        first, last = (datetime.strptime(part[:10], '%Y-%m-%d') for part in spec[:-4].split('--'))
+        for ordinal in range(first.toordinal(), last.toordinal() + 1):
+            day = datetime.fromordinal(ordinal)
+            covered.setdefault((day.month, day.day), []).append(day.year)
+
+    assert len(covered) == num_days
+    assert all(sorted(found) == years for found in covered.values())
+
+
+def test_feb_29_maps_onto_feb_28_in_common_years():
+    assert app.build_range_timestamps(datetime(2028, 2, 29), 1, [2019, 2020]) == [
+        '2019-02-28T12:00:00Z--2019-02-28T12:00:00Z:P1D',
+        '2020-02-29T12:00:00Z--2020-02-29T12:00:00Z:P1D',
+    ]
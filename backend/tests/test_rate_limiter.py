@@ -0,0 +1,59 @@
+"""Background calls must leave the reserved share of the quota to interactive calls"""
+import asyncio
+
+import pytest
+
+import rate_limiter
+
+
+@pytest.fixture
+def small_bucket(monkeypatch, tmp_path):
+    # 4 tokens per minute with half reserved: background may take the bucket down to 2
+    monkeypatch.setattr(rate_limiter, 'RATE_LIMIT_STATE_PATH', str(tmp_path / 'rate_limit.sqlite3'))
+    monkeypatch.setattr(rate_limiter, 'METEOMATICS_RATE_PER_MINUTE', 4)
+    monkeypatch.setattr(rate_limiter, 'METEOMATICS_DAILY_QUOTA', 1000)
+    monkeypatch.setattr(rate_limiter, 'RATE_LIMIT_BACKGROUND_RESERVE', 0.5)
+    monkeypatch.setattr(rate_limiter, '_initialized', False)
+    monkeypatch.setattr(rate_limiter, '_denied', {rate_limiter.INTERACTIVE: 0, rate_limiter.BACKGROUND: 0})
+
+
+def test_background_is_denied_at_the_reserve_while_interactive_is_granted(small_bucket):
+    with rate_limiter.priority(rate_limiter.BACKGROUND):
+        rate_limiter.acquire()
+        rate_limiter.acquire()
+        with pytest.raises(rate_limiter.RateLimitedError):
+            rate_limiter.acquire()
+
+    # The reserve is still there for interactive traffic
+    rate_limiter.acquire(max_wait=0)
+    rate_limiter.acquire(max_wait=0)
+    with pytest.raises(rate_limiter.RateLimitedError):
+        rate_limiter.acquire(max_wait=0)
+
+    usage = rate_limiter.usage()
+    assert usage['used_today'] == 4
+    assert usage['denied'] == {rate_limiter.INTERACTIVE: 1, rate_limiter.BACKGROUND: 1}
+
+
+def test_background_never_waits_for_a_refill(small_bucket):
+    rate_limiter.acquire(rate_limiter.INTERACTIVE, max_wait=0)
+    rate_limiter.acquire(rate_limiter.INTERACTIVE, max_wait=0)
+    with pytest.raises(rate_limiter.RateLimitedError):
+        rate_limiter.acquire(rate_limiter.BACKGROUND)
+    calls_now, _ = rate_limiter.background_headroom()
+    assert calls_now < 1
+
+
+def test_async_acquire_applies_the_same_priorities(small_bucket):
+    async def drain(level, calls):
+        granted = 0
+        for _ in range(calls):
+            try:
+                await rate_limiter.acquire_async(level, max_wait=0)
+                granted += 1
+            except rate_limiter.RateLimitedError:
+                pass
+        return granted
+
+    assert asyncio.run(drain(rate_limiter.BACKGROUND, 4)) == 2
+    assert asyncio.run(drain(rate_limiter.INTERACTIVE, 4)) == 2
@@ -0,0 +1,50 @@
+"""TTL/LRU response cache: eviction order, expiry and coordinate keying"""
+from response_cache import TTLCache, normalize_coordinate
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache('test', max_entries=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache('test', max_entries=10, ttl_seconds=0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_get_or_compute_computes_once():
+    cache = TTLCache('test', max_entries=10, ttl_seconds=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'value': len(calls)}
+
+    assert cache.get_or_compute('a', compute) == {'value': 1}
+    assert cache.get_or_compute('a', compute) == {'value': 1}
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_refresh_only_recomputes_entries_close_to_expiry():
+    cache = TTLCache('test', max_entries=10, ttl_seconds=60)
+    cache.set('a', 1)
+    assert not cache.refresh('a', lambda: 2, min_ttl_seconds=30)
+    assert cache.refresh('a', lambda: 3, min_ttl_seconds=90)
+    assert cache.get('a') == 3
+    assert cache.refresh('missing', lambda: 4, min_ttl_seconds=0)
+
+
+def test_nearby_spellings_share_a_key():
+    assert normalize_coordinate('18.5') == normalize_coordinate(18.50004) == normalize_coordinate('18.500')
+    assert normalize_coordinate('18.5') != normalize_coordinate('18.501')
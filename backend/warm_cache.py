@@ -0,0 +1,41 @@
+"""
+Warm the persistent climatology cache from a list of coordinates
+
+Usage:
+    python warm_cache.py coordinates.csv --start 2025-06-01 --days 30
+
+coordinates.csv holds one "lat,lon" pair per line
+"""
+import argparse
+import csv
+from datetime import datetime, timedelta
+
+from app import warm_climatology_cache
+
+
+def read_coordinates(path):
+    coordinates = []
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                coordinates.append((float(row[0]), float(row[1])))
+            except ValueError:
+                continue  # Skip header or malformed lines
+    return coordinates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Warm the climatology cache')
+    parser.add_argument('coordinates', help='CSV file with one lat,lon pair per line')
+    parser.add_argument('--start', default=datetime.now().strftime('%Y-%m-%d'), help='First date (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=1, help='Number of consecutive days to warm')
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    dates = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(args.days)]
+    coordinates = read_coordinates(args.coordinates)
+
+    fetched = warm_climatology_cache(coordinates, dates)
+    print(f'🔥 Warmed {fetched} entries for {len(coordinates)} locations x {len(dates)} days')
@@ -6,6 +6,33 @@ import './App.css'
 import MapSelector from './MapSelector'
 import { BarChart, Bar, LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, Cell } from 'recharts'
 
+// Save a blob as a file through a temporary link
+function saveBlob(blob, filename) {
+  const url = window.URL.createObjectURL(blob)
+  const link = document.createElement('a')
+  link.href = url
+  link.download = filename
+  document.body.appendChild(link)
+  link.click()
+  document.body.removeChild(link)
+  window.URL.revokeObjectURL(url)
+}
+
+// Save a blob response, named from its Content-Disposition header when present
+function saveBlobResponse(response, defaultFilename, type) {
+  const contentDisposition = response.headers['content-disposition']
+  let filename = defaultFilename
+  if (contentDisposition) {
+    const filenameMatch = contentDisposition.match(/filename=(.+)/)
+    if (filenameMatch) {
+      filename = filenameMatch[1]
+    }
+  }
+
+  saveBlob(type ? new Blob([response.data], { type }) : response.data, filename)
+  return filename
+}
+
 function App() {
   const [mode, setMode] = useState('planning') // 'planning' or 'forecast'
   const [loading, setLoading] = useState(false)
@@ -27,6 +54,25 @@ function App() {
     }
 
     try {
+      if (historicalData.analysis_id) {
+        // Server renders the export from its own copy - no need to upload the analysis
+        try {
+          const response = await axios.get(
+            `http://localhost:5000/api/download/${historicalData.analysis_id}?format=${format}`,
+            { responseType: 'blob' }
+          )
+
+          const filename = saveBlobResponse(response, `weatherwise_analysis.${format}`)
+          alert(`✅ Downloaded ${filename}`)
+          return
+        } catch (error) {
+          // Stored copy expired - fall back to uploading the analysis below
+          if (error.response?.status !== 404) {
+            throw error
+          }
+        }
+      }
+
       if (format === 'csv') {
         // CSV: Direct download from backend
         const response = await axios.post(
@@ -40,28 +86,8 @@ function App() {
           }
         )
 
-        // Create download link
-        const blob = new Blob([response.data], { type: 'text/csv' })
-        const url = window.URL.createObjectURL(blob)
-        const link = document.createElement('a')
-        link.href = url
-        
-        // Extract filename from headers or use default
-        const contentDisposition = response.headers['content-disposition']
-        let filename = 'weatherwise_analysis.csv'
-        if (contentDisposition) {
-          const filenameMatch = contentDisposition.match(/filename=(.+)/)
-          if (filenameMatch) {
-            filename = filenameMatch[1]
-          }
-        }
-        
-        link.download = filename
-        document.body.appendChild(link)
-        link.click()
-        document.body.removeChild(link)
-        window.URL.revokeObjectURL(url)
-
+        // Filename from headers or the default
+        const filename = saveBlobResponse(response, 'weatherwise_analysis.csv', 'text/csv')
         alert(`✅ Downloaded ${filename}`)
         
       } else {
@@ -77,15 +103,7 @@ function App() {
           const blob = new Blob([JSON.stringify(result.content, null, 2)], { 
             type: 'application/json' 
           })
-          
-          const url = window.URL.createObjectURL(blob)
-          const link = document.createElement('a')
-          link.href = url
-          link.download = result.filename
-          document.body.appendChild(link)
-          link.click()
-          document.body.removeChild(link)
-          window.URL.revokeObjectURL(url)
+          saveBlob(blob, result.filename)
 
           alert(`✅ Downloaded ${result.filename}`)
         }